@@ -17,6 +17,7 @@ parser.add_argument('-p_port', metavar='pPort', type=int, help='pPort', default=
 parser.add_argument('-x_port', metavar='xPort', type=int, help='xPort', default=55852)
 parser.add_argument('--app_mode', action='store_true', help='Run in app mode (Fixed UUID)', default=False)
 parser.add_argument('--dev_env', action='store_true', help='Run in dev mode', default=False)
+parser.add_argument('--row_cache_size', metavar='MB', type=int, help='Memory budget (in MB) of the expression row cache shared by all looms', default=512)
 
 args = parser.parse_args()
 
@@ -31,13 +32,14 @@ class SCopeServer():
         self.x_port = args.x_port
         self.app_mode = args.app_mode
         self.dev_env = args.dev_env
+        self.row_cache_size = args.row_cache_size
 
     def start_bind_server(self):
         self.xs_thread = threading.Thread(target=xs.run, args=(self.run_event,), kwargs={'port': self.x_port})
         self.xs_thread.start()
 
     def start_data_server(self):
-        self.gs_thread = threading.Thread(target=gs.serve, args=(self.run_event, self.dev_env,), kwargs={'port': self.g_port, 'app_mode': self.app_mode})
+        self.gs_thread = threading.Thread(target=gs.serve, args=(self.run_event, self.dev_env,), kwargs={'port': self.g_port, 'app_mode': self.app_mode, 'row_cache_size': self.row_cache_size})
         self.ps_thread = threading.Thread(target=ps.run, args=(self.run_event,), kwargs={'port': self.p_port})
         self.gs_thread.start()
         self.ps_thread.start()
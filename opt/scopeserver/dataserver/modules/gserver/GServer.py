@@ -16,9 +16,10 @@ import base64
 import threading
 import pickle
 import uuid
+import hashlib
+import inspect
+import functools
 from collections import OrderedDict, defaultdict
-from functools import lru_cache
-from itertools import compress
 from pathlib import Path
 
 from scopeserver.dataserver.modules.gserver import s_pb2
@@ -29,8 +30,11 @@ from scopeserver.utils import DataFileHandler as dfh
 from scopeserver.utils import GeneSetEnrichment as _gse
 from scopeserver.utils import CellColorByFeatures as ccbf
 from scopeserver.utils import Constant
-from scopeserver.utils import SearchSpace as ss
 from scopeserver.utils.Loom import Loom
+from scopeserver.utils.Codec import Codec
+from scopeserver.utils.FeatureStats import FeatureStats
+from scopeserver.utils.SingleFlight import SingleFlight
+from scopeserver.utils.TTLCache import TTLCache
 
 from pyscenic.genesig import GeneSignature
 from pyscenic.aucell import create_rankings, enrichment, enrichment4cells
@@ -39,6 +43,28 @@ hexarr = np.vectorize('{:02x}'.format)
 
 uploadedLooms = defaultdict(lambda: set())
 
+
+def releases_looms(rpc):
+    """Release the looms leased by the RPC once it is done, so that the ones evicted in the meantime can be closed."""
+    if inspect.isgeneratorfunction(rpc):
+        @functools.wraps(rpc)
+        def streaming_rpc(self, request, context):
+            previous_leases = self.lfh.start_leases()
+            try:
+                yield from rpc(self, request, context)
+            finally:
+                self.lfh.release_leases(previous_leases=previous_leases)
+        return streaming_rpc
+
+    @functools.wraps(rpc)
+    def unary_rpc(self, request, context):
+        previous_leases = self.lfh.start_leases()
+        try:
+            return rpc(self, request, context)
+        finally:
+            self.lfh.release_leases(previous_leases=previous_leases)
+    return unary_rpc
+
 class SCope(s_pb2_grpc.MainServicer):
 
     app_name = 'SCope'
@@ -47,59 +73,62 @@ class SCope(s_pb2_grpc.MainServicer):
     def __init__(self):
         self.dfh = dfh.DataFileHandler(dev_env=SCope.dev_env)
         self.lfh = lfh.LoomFileHandler()
+        self.request_flights = SingleFlight()
+        self.features_cache = TTLCache(max_size=Constant._FEATURES_CACHE_SIZE, ttl=Constant._FEATURES_CACHE_TTL)
 
         self.dfh.load_gene_mappings()
         self.dfh.set_global_data()
         self.lfh.set_global_data()
         self.dfh.read_UUID_db()
+        self.lfh.prewarm_looms(loom_file_paths=[f for f in self.lfh.get_global_looms() if f.endswith('.loom')], warm_loom=self.warm_loom)
+
+    def warm_loom(self, loom):
+        # Do the work needed by the first requests on a loom before any user opens it
+        if not loom.get_file_metadata()['hasGlobalMeta']:
+            # Generating the meta data modifies the file and so its hash, it is left to getMyLooms
+            print("Debug: not prewarming {0}, it has no global meta data".format(loom.get_abs_file_path()))
+            return False
+        loom.get_meta_data()
+        loom.infer_species()
+        loom.get_gene_index()
+        loom.get_nUMI()
+        loom.get_embedding(coordinatesID=-1)
+        if loom.has_regulons_AUC():
+            loom.get_regulons_AUC()
+        loom.get_search_index()
+        # Computed in the background, it can take a while on large looms
+        loom.start_feature_stats()
+        return True
 
     def update_global_data(self):
         self.dfh.set_global_data()
         self.lfh.set_global_data()
 
-    @lru_cache(maxsize=256)
-    def get_features(self, loom, query):
+    def get_features(self, loom, query, session=None, fuzzy=False):
         print(query)
-        start_time = time.time()
         if query.startswith('hsap\\'):
-            search_space = ss.SearchSpace(loom=loom, cross_species='hsap').build()
             cross_species = 'hsap'
             query = query[5:]
         elif query.startswith('mmus\\'):
-            search_space = ss.SearchSpace(loom=loom, cross_species='mmus').build()
             cross_species = 'mmus'
             query = query[5:]
         else:
-            search_space = ss.SearchSpace(loom=loom).build()
             cross_species = ''
-        print("Debug: %s seconds elapsed making search space ---" % (time.time() - start_time))    
+        search_index = loom.get_search_index(cross_species=cross_species)
+        search_space = search_index.search_space
         print(query)
 
         # Filter the genes by the query
 
-        # Allow caps innsensitive searching, minor slowdown
+        # Allow caps innsensitive searching
         start_time = time.time()
-        res = []
-
-        queryCF = query.casefold()
-        res = [x for x in search_space.keys() if queryCF in x[0]]
-
-        for n, r in enumerate(res):
-            if query in r[0]:
-                r = res.pop(n)
-                res = [r] + res
-        for n, r in enumerate(res):
-            if r[0].startswith(queryCF):
-                r = res.pop(n)
-                res = [r] + res
-        for n, r in enumerate(res):
-            if r[0] == queryCF:
-                r = res.pop(n)
-                res = [r] + res
-        for n, r in enumerate(res):
-            if r[1] == query:
-                r = res.pop(n)
-                res = [r] + res
+        if fuzzy:
+            res = search_index.fuzzy_search(query=query)
+        else:
+            res = search_index.search(query=query, session=session)
+            if len(res) == 0:
+                # Maybe misspelled
+                res = search_index.fuzzy_search(query=query)
 
         # These structures are a bit messy, but still fast
         # r = (elementCF, element, elementName)
@@ -112,14 +141,10 @@ class SCope(s_pb2_grpc.MainServicer):
                     collapsedResults[(search_space[r], r[2])] = [r[1]]
                 else:
                     collapsedResults[(search_space[r], r[2])].append(r[1])
-        elif cross_species == 'hsap':
-            for r in res:
-                for dg in self.dfh.hsap_to_dmel_mappings[search_space[r]]:
-                    if (dg[0], r[2]) not in collapsedResults.keys():
-                        collapsedResults[(dg[0], r[2])] = (r[1], dg[1])
-        elif cross_species == 'mmus':
+        else:
+            orthologue_table = self.dfh.get_orthologue_table(species=cross_species)
             for r in res:
-                for dg in self.dfh.mmus_to_dmel_mappings[search_space[r]]:
+                for dg in orthologue_table.get_orthologues(source=search_space[r]):
                     if (dg[0], r[2]) not in collapsedResults.keys():
                         collapsedResults[(dg[0], r[2])] = (r[1], dg[1])
 
@@ -157,14 +182,9 @@ class SCope(s_pb2_grpc.MainServicer):
 
     @staticmethod
     def get_vmax(vals):
-        maxVmax = max(vals)
-        vmax = np.percentile(vals, 99)
-        if vmax == 0 and max(vals) != 0:
-            vmax = max(vals)
-        if vmax == 0:
-            vmax = 0.01
-        return vmax, maxVmax
+        return FeatureStats.get_vmax(vals=vals)
 
+    @releases_looms
     def getVmax(self, request, context):
         v_max = np.zeros(3)
         max_v_max = np.zeros(3)
@@ -177,16 +197,22 @@ class SCope(s_pb2_grpc.MainServicer):
                     l_v_max = 0
                     l_max_v_max = 0
                     loom = self.lfh.get_loom(loom_file_path=loomFilePath)
-                    if request.featureType[n] == 'gene':
+                    feature_vmax = loom.get_feature_vmax(feature_type=request.featureType[n],
+                                                         feature=feature,
+                                                         log_transform=request.hasLogTransform,
+                                                         cpm_normalise=request.hasCpmTransform)
+                    if feature_vmax is not None:
+                        l_v_max, l_max_v_max = feature_vmax
+                    elif request.featureType[n] == 'gene':
                         vals, cell_indices = loom.get_gene_expression(
                             gene_symbol=feature,
                             log_transform=request.hasLogTransform,
                             cpm_normalise=request.hasCpmTransform)
                         l_v_max, l_max_v_max = SCope.get_vmax(vals)
-                    if request.featureType[n] == 'regulon':
+                    elif request.featureType[n] == 'regulon':
                         vals, cell_indices = loom.get_auc_values(regulon=feature)
                         l_v_max, l_max_v_max = SCope.get_vmax(vals)
-                    if request.featureType[n] == 'metric':
+                    elif request.featureType[n] == 'metric':
                         vals, cell_indices = loom.get_metric(
                             metric_name=feature,
                             log_transform=request.hasLogTransform,
@@ -194,20 +220,32 @@ class SCope(s_pb2_grpc.MainServicer):
                         l_v_max, l_max_v_max = SCope.get_vmax(vals)
                     if l_v_max > f_v_max:
                         f_v_max = l_v_max
-                if l_max_v_max > f_max_v_max:
-                    f_max_v_max = l_max_v_max
+                    if l_max_v_max > f_max_v_max:
+                        f_max_v_max = l_max_v_max
             v_max[n] = f_v_max
             max_v_max[n] = f_max_v_max
         return s_pb2.VmaxReply(vmax=v_max, maxVmax=max_v_max)
 
+    @staticmethod
+    def get_request_digest(loom, request):
+        # Identical requests on the same version of a .loom have the same digest
+        return hashlib.md5(loom.partial_md5_hash.encode('utf-8') + request.SerializeToString(deterministic=True)).hexdigest()
+
+    @releases_looms
     def getCellColorByFeatures(self, request, context):
-        start_time = time.time()
         try:
             loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
         except ValueError:
             return
+        # Users viewing the same features at the same time share a single computation
+        return self.request_flights.do(key=("getCellColorByFeatures", SCope.get_request_digest(loom=loom, request=request)),
+                                       fn=self.computeCellColorByFeatures,
+                                       loom=loom,
+                                       request=request)
 
-        cell_color_by_features = ccbf.CellColorByFeatures(loom=loom)
+    def computeCellColorByFeatures(self, loom, request):
+        start_time = time.time()
+        cell_color_by_features = ccbf.CellColorByFeatures(loom=loom, codec=Codec.from_request(codec_options=request.codec))
 
         for n, feature in enumerate(request.feature):
             if request.featureType[n] == 'gene':
@@ -215,7 +253,7 @@ class SCope(s_pb2_grpc.MainServicer):
             elif request.featureType[n] == 'regulon':
                 cell_color_by_features.setRegulonFeature(request=request, feature=feature, n=n)
             elif request.featureType[n] == 'annotation':
-                cell_color_by_features.setAnnotationFeature(feature=feature)
+                cell_color_by_features.setAnnotationFeature(request=request, feature=feature)
                 return cell_color_by_features.getReply()
             elif request.featureType[n] == 'metric':
                 cell_color_by_features.setMetricFeature(request=request, feature=feature, n=n)
@@ -227,18 +265,34 @@ class SCope(s_pb2_grpc.MainServicer):
                 cell_color_by_features.addEmptyFeature()
 
         print("Debug: %s seconds elapsed ---" % (time.time() - start_time))
+        print("Debug: expression row cache {0}".format(Loom.row_cache.get_stats()))
+        print("Debug: coalesced requests {0}".format(self.request_flights.get_stats()))
+        print("Debug: loom identities {0}".format(self.lfh.get_loom_identity_stats()))
+        if request.hasPackedColor:
+            packed_color, validity_bitmap = cell_color_by_features.get_packed_rgb(compress=request.compressPackedColor)
+            return s_pb2.CellColorByFeaturesReply(packedColor=packed_color,
+                                                  validityBitmap=validity_bitmap,
+                                                  isPackedColorCompressed=request.compressPackedColor,
+                                                  vmax=cell_color_by_features.get_v_max(),
+                                                  maxVmax=cell_color_by_features.get_max_v_max(),
+                                                  # Colours are in the order of the cells of the .loom when there is no filter
+                                                  cellIndices=cell_color_by_features.get_cell_indices() if len(request.annotation) > 0 else [],
+                                                  codecStats=cell_color_by_features.get_codec_stats())
         return s_pb2.CellColorByFeaturesReply(color=None,
                                               compressedColor=cell_color_by_features.get_compressed_hex_vec(),
-                                              hasAddCompressionLayer=True,
+                                              hasAddCompressionLayer=cell_color_by_features.codec.is_compressing(),
                                               vmax=cell_color_by_features.get_v_max(),
                                               maxVmax=cell_color_by_features.get_max_v_max(),
-                                              cellIndices=cell_color_by_features.get_cell_indices())
+                                              cellIndices=cell_color_by_features.get_cell_indices(),
+                                              codecStats=cell_color_by_features.get_codec_stats())
 
+    @releases_looms
     def getCellAUCValuesByFeatures(self, request, context):
         loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
         vals, cellIndices = loom.get_auc_values(regulon=request.feature[0])
         return s_pb2.CellAUCValuesByFeaturesReply(value=vals)
 
+    @releases_looms
     def getCellMetaData(self, request, context):
         loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
         cell_indices = request.cellIndices
@@ -250,12 +304,12 @@ class SCope(s_pb2_grpc.MainServicer):
             if clustering_id != '':
                 cell_clusters.append(loom.get_clustering_by_id(clustering_id=clustering_id)[cell_indices])
         gene_exp = []
-        for gene in request.selectedGenes:
-            if gene != '':
-                vals, _ = loom.get_gene_expression(gene_symbol=gene,
-                                                   log_transform=request.hasLogTransform,
-                                                   cpm_normalise=request.hasCpmTransform)
-                gene_exp.append(vals[cell_indices])
+        genes = [gene for gene in request.selectedGenes if gene != '']
+        if len(genes) > 0:
+            genes_expr, _ = loom.get_genes_expression(gene_symbols=genes,
+                                                      log_transform=request.hasLogTransform,
+                                                      cpm_normalise=request.hasCpmTransform)
+            gene_exp = list(genes_expr[:, list(cell_indices)])
         auc_vals = []
         for regulon in request.selectedRegulons:
             if regulon != '':
@@ -271,19 +325,37 @@ class SCope(s_pb2_grpc.MainServicer):
                                        aucValues=[s_pb2.FeatureValues(features=x) for x in gene_exp],
                                        annotations=[s_pb2.CellAnnotations(annotations=x) for x in annotations])
 
+    @releases_looms
     def getFeatures(self, request, context):
         loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
-        f = self.get_features(loom=loom, query=request.query)
+        features_key = (loom.partial_md5_hash, request.query, request.fuzzy)
+        f = self.features_cache.get(features_key)
+        if f is None:
+            # Successive queries of a user are identified by its UUID, queries without one are not narrowed down
+            # (the connection does not identify a user: all the browsers reach the server through the same proxy)
+            session = request.UUID if request.UUID != '' else None
+            f = self.get_features(loom=loom, query=request.query, session=session, fuzzy=request.fuzzy)
+            self.features_cache.put(features_key, f)
         return s_pb2.FeatureReply(feature=f['feature'], featureType=f['featureType'], featureDescription=f['featureDescription'])
 
+    @releases_looms
     def getCoordinates(self, request, context):
         # request content
         loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
         c = loom.get_coordinates(coordinatesID=request.coordinatesID,
                                  annotation=request.annotation,
                                  logic=request.logic)
+        if request.hasPackedCoordinates:
+            # float32 x, float32 y and int32 cellIndices of the cells, one after the other
+            codec = Codec.from_request(codec_options=request.codec, default_name='identity')
+            packed_coordinates = b''.join([np.asarray(c["x"], dtype='<f4').tobytes(),
+                                           np.asarray(c["y"], dtype='<f4').tobytes(),
+                                           np.asarray(c["cellIndices"], dtype='<i4').tobytes()])
+            return s_pb2.CoordinatesReply(packedCoordinates=codec.encode(data=packed_coordinates, itemsize=4),
+                                          codecStats=codec.get_stats())
         return s_pb2.CoordinatesReply(x=c["x"], y=c["y"], cellIndices=c["cellIndices"])
 
+    @releases_looms
     def getRegulonMetaData(self, request, context):
         loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
         regulon_genes = loom.get_regulon_genes(regulon=request.regulon)
@@ -291,15 +363,12 @@ class SCope(s_pb2_grpc.MainServicer):
         if len(regulon_genes) == 0:
             print("Something is wrong in the loom file: no regulon found!")
 
-        meta_data = loom.get_meta_data()
-        for regulon in meta_data['regulonThresholds']:
-            if regulon['regulon'] == request.regulon:
-                autoThresholds = []
-                for threshold in regulon['allThresholds'].keys():
-                    autoThresholds.append({"name": threshold, "threshold": regulon['allThresholds'][threshold]})
-                defaultThreshold = regulon['defaultThresholdName']
-                motifName = os.path.basename(regulon['motifData'])
-                break
+        regulon = loom.get_meta_data_regulon_by_name(name=request.regulon)
+        autoThresholds = []
+        for threshold in regulon['allThresholds'].keys():
+            autoThresholds.append({"name": threshold, "threshold": regulon['allThresholds'][threshold]})
+        defaultThreshold = regulon['defaultThresholdName']
+        motifName = os.path.basename(regulon['motifData'])
 
         regulon = {"genes": regulon_genes,
                    "autoThresholds": autoThresholds,
@@ -309,6 +378,7 @@ class SCope(s_pb2_grpc.MainServicer):
 
         return s_pb2.RegulonMetaDataReply(regulonMeta=regulon)
 
+    @releases_looms
     def getMarkerGenes(self, request, context):
         loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
         # Check if cluster markers for the given clustering are present in the loom
@@ -344,6 +414,7 @@ class SCope(s_pb2_grpc.MainServicer):
         gene_sets = [s_pb2.MyGeneSet(geneSetFilePath=f, geneSetDisplayName=os.path.splitext(os.path.basename(f))[0]) for f in geneSetsToProcess]
         return s_pb2.MyGeneSetsReply(myGeneSets=gene_sets)
 
+    @releases_looms
     def getMyLooms(self, request, context):
         my_looms = []
         userDir = dfh.DataFileHandler.get_data_dir_path_by_file_type('Loom', UUID=request.UUID)
@@ -414,6 +485,7 @@ class SCope(s_pb2_grpc.MainServicer):
                 for i in ['Loom', 'GeneSet', 'LoomAUCellRankings']:
                     if os.path.exists(os.path.join(self.dfh.get_data_dirs()[i]['path'], uid)):
                         shutil.rmtree(os.path.join(self.dfh.get_data_dirs()[i]['path'], uid))
+                self.lfh.evict_deleted_looms()
         uid = request.UUID
         if uid in self.dfh.get_current_UUIDs():
             startTime = self.dfh.get_current_UUIDs()[uid]
@@ -443,19 +515,18 @@ class SCope(s_pb2_grpc.MainServicer):
             self.dfh.reset_active_session_timeout(uid)
         return s_pb2.RemainingUUIDTimeReply(UUID=uid, timeRemaining=timeRemaining, sessionsLimitReached=sessionsLimitReached)
 
+    @releases_looms
     def translateLassoSelection(self, request, context):
         src_loom = self.lfh.get_loom(loom_file_path=request.srcLoomFilePath)
         dest_loom = self.lfh.get_loom(loom_file_path=request.destLoomFilePath)
-        src_cell_ids = [src_loom.get_cell_ids()[i] for i in request.cellIndices]
-        src_fast_index = set(src_cell_ids)
-        dest_mask = [x in src_fast_index for x in dest_loom.get_cell_ids()]
-        dest_cell_indices = list(compress(range(len(dest_mask)), dest_mask))
+        dest_cell_indices = src_loom.translate_cell_indices(cell_indices=request.cellIndices, dest_loom=dest_loom)
         return s_pb2.TranslateLassoSelectionReply(cellIndices=dest_cell_indices)
 
+    @releases_looms
     def getCellIDs(self, request, context):
         loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
         cell_ids = loom.get_cell_ids()
-        slctd_cell_ids = [cell_ids[i] for i in request.cellIndices]
+        slctd_cell_ids = cell_ids[np.asarray(request.cellIndices, dtype=np.int64)]
         return s_pb2.CellIDsReply(cellIds=slctd_cell_ids)
 
     def deleteUserFile(self, request, context):
@@ -463,12 +534,14 @@ class SCope(s_pb2_grpc.MainServicer):
         finalPath = os.path.join(self.dfh.get_data_dirs()[request.fileType]['path'], request.UUID, basename)
         if os.path.isfile(finalPath) and (basename.endswith('.loom') or basename.endswith('.txt')):
             os.remove(finalPath)
+            self.lfh.evict_deleted_looms()
             success = True
         else:
             success = False
 
         return s_pb2.DeleteUserFileReply(deletedSuccessfully=success)
     
+    @releases_looms
     def downloadSubLoom(self, request, context):
         start_time = time.time()
 
@@ -485,7 +558,7 @@ class SCope(s_pb2_grpc.MainServicer):
         if(request.featureType == "clusterings"):
             a = list(filter(lambda x : x['name'] == request.featureName, meta_data["clusterings"]))
             b = list(filter(lambda x : x['description'] == request.featureValue, a[0]['clusters']))[0]
-            cells = loom_connection.ca["Clusterings"][str(a[0]['id'])] == b['id']
+            cells = loom.get_clustering_by_id(clustering_id=a[0]['id']) == b['id']
             print("Number of cells in {0}: {1}".format(request.featureValue, np.sum(cells)))
             sub_loom_file_name = file_name +"_Sub_"+ request.featureValue.replace(" ", "_").replace("/","_")
             sub_loom_file_path = os.path.join(self.dfh.get_data_dirs()['Loom']['path'], "tmp" , sub_loom_file_name +".loom")
@@ -535,6 +608,7 @@ class SCope(s_pb2_grpc.MainServicer):
     #
     # Threaded makes it slower because of GIL
     #
+    @releases_looms
     def doGeneSetEnrichment(self, request, context):
         gene_set_file_path = os.path.join(self.dfh.get_gene_sets_dir(), request.geneSetFilePath)
         loom = self.lfh.get_loom(loom_file_path=request.loomFilePath)
@@ -593,9 +667,11 @@ class SCope(s_pb2_grpc.MainServicer):
         return s_pb2.LoomUploadedReply()
 
 
-def serve(run_event, dev_env=False, port=50052, app_mode=False):
+def serve(run_event, dev_env=False, port=50052, app_mode=False, row_cache_size=None):
     SCope.dev_env = dev_env
     SCope.app_mode = app_mode
+    if row_cache_size is not None:
+        Loom.row_cache.set_max_bytes(max_bytes=row_cache_size * 1024 * 1024)
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
     scope = SCope()
     s_pb2_grpc.add_MainServicer_to_server(scope, server)
@@ -612,6 +688,8 @@ def serve(run_event, dev_env=False, port=50052, app_mode=False):
     scope.dfh.get_uuid_log().close()
     scope.dfh.update_UUID_db()
     server.stop(0)
+    scope.lfh.stop_prewarm()
+    Loom.stop_feature_stats()
 
 
 if __name__ == '__main__':
@@ -1,62 +1,148 @@
 import numpy as np
 import re
+import colorsys
 import itertools
 import time
-import zlib
-import sys
 
 from scopeserver.dataserver.modules.gserver import s_pb2
 from scopeserver.utils import Constant
+from scopeserver.utils.Codec import Codec
+from scopeserver.utils.FeatureStats import FeatureStats
 
 class CellColorByFeatures():
 
-    def __init__(self, loom):
+    # Lowercase hex digits of each byte value
+    HEX_DIGITS = np.frombuffer(bytes(''.join("{0:02x}".format(i) for i in range(256)), 'ascii'), dtype=np.uint8).reshape(256, 2)
+    # Hex colour of the cells with no value in any feature
+    NO_VALUE_HEX = np.frombuffer(b"XXXXXX", dtype=np.uint8)
+
+    def __init__(self, loom, codec=None):
         self.loom = loom
+        # Codec of the compressed payloads of the reply
+        self.codec = codec if codec is not None else Codec()
         self.meta_data = loom.get_meta_data()
         self.n_cells = loom.get_nb_cells()
+        # uint8 value of each cell for each feature and whether it is 0 before its conversion to uint8
         self.features = []
+        self.features_is_zero = []
+        self.genes_expr = None
         self.hex_vec = []
         self.v_max = np.zeros(3)
         self.max_v_max = np.zeros(3)
         self.cell_indices = list(range(self.n_cells))
         self.reply = None
     
-    @staticmethod # TO GET FROM GServer SCOPE
+    @staticmethod
     def get_vmax(vals):
-        maxVmax = max(vals)
-        vmax = np.percentile(vals, 99)
-        if vmax == 0 and max(vals) != 0:
-            vmax = max(vals)
-        if vmax == 0:
-            vmax = 0.01
-        return vmax, maxVmax
+        return FeatureStats.get_vmax(vals=vals)
+
+    def get_feature_vmax(self, request, feature_type, feature, vals):
+        # Taken from the feature stats table of the .loom when the values are the ones of all the cells
+        if len(request.annotation) == 0:
+            feature_vmax = self.loom.get_feature_vmax(feature_type=feature_type,
+                                                      feature=feature,
+                                                      log_transform=request.hasLogTransform,
+                                                      cpm_normalise=request.hasCpmTransform)
+            if feature_vmax is not None:
+                return feature_vmax
+        return CellColorByFeatures.get_vmax(vals)
+
+    @staticmethod
+    def scale_to_rgb(vals, v_max):
+        # Scale the values to [_LOWER_LIMIT_RGB, _UPPER_LIMIT_RGB], the ones above v_max (and NaNs) are set to _UPPER_LIMIT_RGB
+        vals = np.asarray(vals) / v_max
+        min_val = vals.min() if len(vals) > 0 else 0
+        vals = (((Constant._UPPER_LIMIT_RGB - Constant._LOWER_LIMIT_RGB) * (vals - min_val)) / (1 - min_val)) + Constant._LOWER_LIMIT_RGB
+        return np.where(vals <= Constant._UPPER_LIMIT_RGB, vals, Constant._UPPER_LIMIT_RGB)
+
+    @staticmethod
+    def get_palette(n_colors):
+        """Get n_colors hex colours, the ones of BIG_COLOR_LIST first followed by generated ones.
+
+        The generated colours spread their hue with the golden ratio and cycle through a few saturations and brightnesses.
+
+        """
+        palette = Constant.BIG_COLOR_LIST[:n_colors]
+        for i in range(n_colors - len(palette)):
+            hue = (i * 0.618033988749895) % 1
+            saturation = [0.9, 0.6, 0.35][i % 3]
+            brightness = [0.95, 0.7, 0.45][(i // 3) % 3]
+            palette.append(''.join("{0:02x}".format(int(round(c * 255))) for c in colorsys.hsv_to_rgb(hue, saturation, brightness)))
+        return palette
 
     @staticmethod
-    def compress_str_array(str_arr):
+    def get_palette_code_dtype(n_colors):
+        # Smallest little-endian unsigned integer type able to index a palette of n_colors
+        if n_colors <= 1 << 8:
+            return np.dtype('<u1')
+        if n_colors <= 1 << 16:
+            return np.dtype('<u2')
+        return np.dtype('<u4')
+
+    def encode(self, data, itemsize=1):
         print("Compressing... ")
-        str_array_size = sys.getsizeof(str_arr)
-        str_array_joint = bytes(''.join(str_arr), 'utf-8')
-        str_array_joint_compressed = zlib.compress(str_array_joint, 1)
-        str_array_joint_compressed_size = sys.getsizeof(str_array_joint_compressed)
-        savings_percent = 1-str_array_joint_compressed_size/str_array_size
+        data_compressed = self.codec.encode(data=data, itemsize=itemsize)
+        savings_percent = 1 - len(data_compressed) / len(data) if len(data) > 0 else 0
         print("Saving "+"{:.2%} of space".format(savings_percent))
-        return str_array_joint_compressed
+        return data_compressed
+
+    def get_codec_stats(self):
+        return self.codec.get_stats()
     
     def get_features(self):
         return self.features
 
-    def get_hex_vec(self):
+    def get_rgb(self):
+        """Stack the features as a (cells x 3) uint8 array.
+
+        Returns:
+            tuple: The RGB array and a boolean array telling which cells have no value in any feature.
+
+        """
         for _ in itertools.repeat(None, 3-len(self.features)):
             self.addEmptyFeature()
-        if len(self.features) > 0 and len(self.hex_vec) == 0:
-            self.hex_vec = ["XXXXXX" if r == g == b == 0
-                       else "{0:02x}{1:02x}{2:02x}".format(int(r), int(g), int(b))
-                       for r, g, b in zip(self.features[0], self.features[1], self.features[2])]
+        # Features can have different lengths (e.g.: annotation filter), the shortest one wins
+        n_cells = min(len(feature) for feature in self.features[:3])
+        rgb = np.empty((n_cells, 3), dtype=np.uint8)
+        no_value = np.ones(n_cells, dtype=bool)
+        for n in range(3):
+            rgb[:, n] = self.features[n][:n_cells]
+            no_value &= self.features_is_zero[n][:n_cells]
+        return rgb, no_value
+
+    def get_hex_bytes(self):
+        # Concatenated 6-character hex colours of the cells ("XXXXXX" for the cells with no value), as ASCII bytes
+        rgb, no_value = self.get_rgb()
+        hex_digits = CellColorByFeatures.HEX_DIGITS[rgb].reshape(len(rgb), 6)
+        hex_digits[no_value] = CellColorByFeatures.NO_VALUE_HEX
+        return hex_digits.tobytes()
+
+    def get_hex_vec(self):
+        if len(self.hex_vec) == 0:
+            hex_bytes = self.get_hex_bytes().decode('ascii')
+            self.hex_vec = [hex_bytes[i:i + 6] for i in range(0, len(hex_bytes), 6)]
         return self.hex_vec
     
+    def get_packed_rgb(self, compress=False):
+        """Get the colours of the cells as raw RGB bytes (3 per cell) and a bitmap of the cells having a value.
+
+        The bitmap has one bit per cell, most significant bit first, set when the cell has a value in any feature.
+        Both are encoded with the codec when compress is True.
+
+        """
+        rgb, no_value = self.get_rgb()
+        packed_rgb = rgb.tobytes()
+        validity_bitmap = np.packbits(~no_value).tobytes()
+        if compress:
+            comp_start_time = time.time()
+            packed_rgb = self.encode(data=packed_rgb, itemsize=3)
+            validity_bitmap = self.encode(data=validity_bitmap)
+            print("Debug: %s seconds elapsed (compression) ---" % (time.time() - comp_start_time))
+        return packed_rgb, validity_bitmap
+
     def get_compressed_hex_vec(self):
         comp_start_time = time.time()
-        hex_vec_compressed = CellColorByFeatures.compress_str_array(str_arr=self.get_hex_vec())
+        hex_vec_compressed = self.encode(data=self.get_hex_bytes(), itemsize=6)
         print("Debug: %s seconds elapsed (compression) ---" % (time.time() - comp_start_time))
         return hex_vec_compressed
 
@@ -69,59 +155,95 @@ class CellColorByFeatures():
     def get_cell_indices(self):
         return self.cell_indices
     
+    def loadGeneFeatures(self, request):
+        # Read the expression of all the gene features of the request at once
+        genes = [feature for n, feature in enumerate(request.feature) if request.featureType[n] == 'gene' and feature != '']
+        genes_expr, self.cell_indices = self.loom.get_genes_expression(
+            gene_symbols=genes,
+            log_transform=request.hasLogTransform,
+            cpm_normalise=request.hasCpmTransform,
+            annotation=request.annotation,
+            logic=request.logic)
+        self.genes_expr = dict(zip(genes, genes_expr))
+
     def setGeneFeature(self, request, feature, n):
         if feature != '':
-            vals, self.cellIndices = self.loom.get_gene_expression(
-                gene_symbol=feature,
-                log_transform=request.hasLogTransform,
-                cpm_normalise=request.hasCpmTransform,
-                annotation=request.annotation,
-                logic=request.logic)
+            if self.genes_expr is None:
+                self.loadGeneFeatures(request=request)
+            vals = self.genes_expr[feature]
             if request.vmax[n] != 0.0:
                 self.v_max[n] = request.vmax[n]
             else:
-                self.v_max[n], self.max_v_max[n] = CellColorByFeatures.get_vmax(vals)
-            # vals = np.round((vals / vmax[n]) * 225)
-            vals = vals / self.v_max[n]
-            vals = (((Constant._UPPER_LIMIT_RGB - Constant._LOWER_LIMIT_RGB) * (vals - min(vals))) / (1 - min(vals))) + Constant._LOWER_LIMIT_RGB
-            self.features.append([x if x <= Constant._UPPER_LIMIT_RGB else Constant._UPPER_LIMIT_RGB for x in vals])
+                self.v_max[n], self.max_v_max[n] = self.get_feature_vmax(request=request, feature_type='gene', feature=feature, vals=vals)
+            self.addFeature(vals=CellColorByFeatures.scale_to_rgb(vals=vals, v_max=self.v_max[n]))
         else:
-            self.features.append(np.zeros(self.n_cells))
+            self.addEmptyFeature()
 
     def setRegulonFeature(self, request, feature, n):
         if feature != '':
-            vals, self.cellIndices = self.loom.get_auc_values(regulon=feature,
+            vals, self.cell_indices = self.loom.get_auc_values(regulon=feature,
                                                     annotation=request.annotation,
                                                     logic=request.logic)
             if request.vmax[n] != 0.0:
                 self.v_max[n] = request.vmax[n]
             else:
-                self.v_max[n], self.max_v_max[n] = CellColorByFeatures.get_vmax(vals)
+                self.v_max[n], self.max_v_max[n] = self.get_feature_vmax(request=request, feature_type='regulon', feature=feature, vals=vals)
+            vals = np.asarray(vals)
             if request.scaleThresholded:
-                vals = ([auc if auc >= request.threshold[n] else 0 for auc in vals])
-                # vals = np.round((vals / vmax[n]) * 225)
-                vals = vals / self.v_max[n]
-                vals = (((Constant._UPPER_LIMIT_RGB - Constant._LOWER_LIMIT_RGB) * (vals - min(vals))) / (1 - min(vals))) + Constant._LOWER_LIMIT_RGB
-                self.features.append([x if x <= Constant._UPPER_LIMIT_RGB else Constant._UPPER_LIMIT_RGB for x in vals])
+                vals = np.where(vals >= request.threshold[n], vals, 0)
+                self.addFeature(vals=CellColorByFeatures.scale_to_rgb(vals=vals, v_max=self.v_max[n]))
             else:
-                self.features.append([Constant._UPPER_LIMIT_RGB if auc >= request.threshold[n] else 0 for auc in vals])
+                self.addFeature(vals=np.where(vals >= request.threshold[n], Constant._UPPER_LIMIT_RGB, 0))
         else:
-            self.features.append(np.zeros(self.n_cells))
+            self.addEmptyFeature()
     
-    def setAnnotationFeature(self, feature):
-        md_annotation_values = self.loom.get_meta_data_annotation_by_name(name=feature)["values"]
-        ca_annotation = self.loom.get_ca_attr_by_name(name=feature)
-        ca_annotation_as_int = list(map(lambda x: md_annotation_values.index(str(x)), ca_annotation))
-        num_annotations = max(ca_annotation_as_int)
-        if num_annotations <= len(Constant.BIG_COLOR_LIST):
-            self.hex_vec = list(map(lambda x: Constant.BIG_COLOR_LIST[x], ca_annotation_as_int))
+    def setCategoricalReply(self, request, palette, codes, legend=None):
+        """Set the reply of a categorical feature.
+
+        Args:
+            palette (list): The hex colours of the categories.
+            codes (numpy.ndarray): The index in palette of the colour of each cell.
+
+        The reply carries the palette and the codes of the cells as bytes if the request has hasPaletteColor,
+        otherwise the hex colour of each cell. The codes are encoded with the codec if the request gives one.
+
+        """
+        if len(request.annotation) > 0:
+            self.cell_indices = self.loom.get_anno_cells(annotations=request.annotation, logic=request.logic)
+            codes = codes[self.cell_indices]
+        if request.hasPaletteColor:
+            code_dtype = CellColorByFeatures.get_palette_code_dtype(n_colors=len(palette))
+            palette_codes = codes.astype(code_dtype).tobytes()
+            if request.HasField('codec'):
+                palette_codes = self.encode(data=palette_codes, itemsize=code_dtype.itemsize)
+            reply = s_pb2.CellColorByFeaturesReply(palette=palette,
+                                                   paletteCodes=palette_codes,
+                                                   paletteCodeSize=code_dtype.itemsize,
+                                                   vmax=self.v_max,
+                                                   cellIndices=self.cell_indices if len(request.annotation) > 0 else [],
+                                                   legend=legend,
+                                                   codecStats=self.get_codec_stats() if request.HasField('codec') else None)
         else:
-            raise ValueError("The annotation {0} has too many unique values.".format(feature))
-        # Set the reply
-        reply = s_pb2.CellColorByFeaturesReply(color=self.hex_vec,
-                                               vmax=self.v_max,
-                                               legend=s_pb2.ColorLegend(values=md_annotation_values, colors=Constant.BIG_COLOR_LIST[:len(md_annotation_values)]))
+            self.hex_vec = np.asarray(palette)[codes].tolist()
+            reply = s_pb2.CellColorByFeaturesReply(color=self.hex_vec,
+                                                   vmax=self.v_max,
+                                                   legend=legend)
         self.setReply(reply=reply)
+
+    def setAnnotationFeature(self, request, feature):
+        md_annotation_values = self.loom.get_meta_data_annotation_by_name(name=feature)["values"]
+        md_annotation_indices = {str(value): i for i, value in enumerate(md_annotation_values)}
+        categories, codes = self.loom.get_anno_codes(anno_name=feature)
+        unknown_categories = [category for category in categories if category not in md_annotation_indices]
+        if len(unknown_categories) > 0:
+            raise ValueError("The values {0} of the annotation {1} are not in the meta data.".format(unknown_categories, feature))
+        # Colours are given in the order of the annotation values in the meta data
+        md_codes = np.array([md_annotation_indices[category] for category in categories], dtype=np.int64)[codes]
+        palette = CellColorByFeatures.get_palette(n_colors=len(md_annotation_values))
+        self.setCategoricalReply(request=request,
+                                 palette=palette,
+                                 codes=md_codes,
+                                 legend=s_pb2.ColorLegend(values=md_annotation_values, colors=palette))
     
     def setMetricFeature(self, request, feature, n):
         if feature != '':
@@ -134,13 +256,10 @@ class CellColorByFeatures():
             if request.vmax[n] != 0.0:
                 self.v_max[n] = request.vmax[n]
             else:
-                self.v_max[n], self.max_v_max[n] = CellColorByFeatures.get_vmax(vals)
-            # vals = np.round((vals / vmax[n]) * 225)
-            vals = vals / self.v_max[n]
-            vals = (((Constant._UPPER_LIMIT_RGB - Constant._LOWER_LIMIT_RGB) * (vals - min(vals))) / (1 - min(vals))) + Constant._LOWER_LIMIT_RGB
-            self.features.append([x if x <= Constant._UPPER_LIMIT_RGB else Constant._UPPER_LIMIT_RGB for x in vals])
+                self.v_max[n], self.max_v_max[n] = self.get_feature_vmax(request=request, feature_type='metric', feature=feature, vals=vals)
+            self.addFeature(vals=CellColorByFeatures.scale_to_rgb(vals=vals, v_max=self.v_max[n]))
         else:
-            self.features.append(np.zeros(self.n_cells))
+            self.addEmptyFeature()
     
     def setClusteringFeature(self, request, feature, n):
         clusteringID = None
@@ -150,19 +269,14 @@ class CellColorByFeatures():
             if clustering['name'] == re.sub('^Clustering: ', '', request.featureType[n]):
                 clusteringID = str(clustering['id'])
                 if request.feature[n] == 'All Clusters':
-                    numClusters = max(self.loom.get_clustering_by_id(clusteringID))
-                    if numClusters <= 245:
-                        for i in self.loom.get_clustering_by_id(clusteringID):
-                            self.hex_vec.append(Constant.BIG_COLOR_LIST[i])
-                    else:
-                        interval = int(16581375 / numClusters)
-                        hex_vec = [hex(I)[2:].zfill(6) for I in range(0, numClusters, interval)]
-                    if len(request.annotation) > 0:
-                        cellIndices = self.loom.get_anno_cells(annotations=request.annotation, logic=request.logic)
-                        hex_vec = np.array(hex_vec)[cellIndices]
+                    categories, codes = self.loom.get_anno_codes(anno_name="Clustering_{0}".format(clusteringID))
+                    cluster_ids = categories.astype(np.int64)
+                    # The colour of a cluster is given by its ID
+                    cluster_colors = CellColorByFeatures.get_palette(n_colors=max(len(Constant.BIG_COLOR_LIST), int(cluster_ids.max()) + 1))
                     # Set the reply and break the for loop
-                    reply = s_pb2.CellColorByFeaturesReply(color=self.hex_vec, vmax=self.v_max)
-                    self.setReply(reply=reply)
+                    self.setCategoricalReply(request=request,
+                                             palette=[cluster_colors[cluster_id] for cluster_id in cluster_ids],
+                                             codes=codes)
                     break
                 else:
                     for cluster in clustering['clusters']:
@@ -175,14 +289,20 @@ class CellColorByFeatures():
 
         if clusteringID is not None and clusterID is not None:
             clusterIndices = self.loom.get_clustering_by_id(clusteringID) == clusterID
-            clusterCol = np.array([Constant._UPPER_LIMIT_RGB if x else 0 for x in clusterIndices])
+            clusterCol = np.where(clusterIndices, Constant._UPPER_LIMIT_RGB, 0)
             if len(request.annotation) > 0:
                 cellIndices = self.loom.get_anno_cells(annotations=request.annotation, logic=request.logic)
                 clusterCol = clusterCol[cellIndices]
-            self.features.append(clusterCol)
+            self.addFeature(vals=clusterCol)
+
+    def addFeature(self, vals):
+        # vals are already scaled to [_LOWER_LIMIT_RGB, _UPPER_LIMIT_RGB], they are truncated to integers
+        vals = np.asarray(vals)
+        self.features.append(np.clip(vals, 0, 255).astype(np.uint8))
+        self.features_is_zero.append(vals == 0)
 
     def addEmptyFeature(self):
-        self.features.append([Constant._LOWER_LIMIT_RGB for n in range(self.n_cells)])
+        self.addFeature(vals=np.full(self.n_cells, Constant._LOWER_LIMIT_RGB, dtype=np.uint8))
 
     def hasReply(self):
         return self.reply != None
@@ -0,0 +1,150 @@
+import time
+import zlib
+import numpy as np
+
+from scopeserver.dataserver.modules.gserver import s_pb2
+
+# Faster codecs, used only if installed (pip install scope-server[fast-codecs])
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class Codec():
+
+    '''
+    Codec class encodes the binary payloads of the replies:
+    - identity: no compression
+    - zlib: zlib at the given level (1 to 9)
+    - lz4: lz4 frame at the given level (0 to 16), if the lz4 package is installed
+    - zstd: zstandard at the given level (1 to 22), if the zstandard package is installed
+    With shuffle, the bytes of the payload are transposed by element (byte i of every element first) before
+    compression, which groups the bytes varying slowly (e.g.: the exponents of float32 values) together.
+    The sizes and times of the payloads it encodes are summed up in its stats, which are sent with the reply.
+    '''
+
+    NAMES = ['identity', 'zlib', 'lz4', 'zstd']
+    # Level used when the request does not give one
+    DEFAULT_LEVELS = {"identity": 0, "zlib": 1, "lz4": 0, "zstd": 3}
+    # Levels supported by each codec, the requested level is clamped to them
+    LEVEL_RANGES = {"identity": (0, 0), "zlib": (1, 9), "lz4": (0, 16), "zstd": (1, 22)}
+
+    def __init__(self, name='zlib', level=0, shuffle=False, measure_decode=False):
+        if name not in Codec.get_available_names():
+            raise ValueError("The codec {0} is not available, the available codecs are: {1}".format(name, ', '.join(Codec.get_available_names())))
+        self.name = name
+        self.level = Codec.get_level(name=name, level=level)
+        self.shuffle = shuffle
+        self.measure_decode = measure_decode
+        self.raw_size = 0
+        self.encoded_size = 0
+        self.encode_time = 0
+        self.decode_time = 0
+
+    @staticmethod
+    def get_available_names():
+        return [name for name in Codec.NAMES if (name != 'lz4' or lz4_frame is not None) and (name != 'zstd' or zstandard is not None)]
+
+    @staticmethod
+    def get_level(name, level):
+        # 0 stands for the default level of the codec
+        if level == 0:
+            return Codec.DEFAULT_LEVELS[name]
+        min_level, max_level = Codec.LEVEL_RANGES[name]
+        return min(max(level, min_level), max_level)
+
+    @staticmethod
+    def from_request(codec_options, default_name='zlib'):
+        """Get the codec asked by the CodecOptions of a request.
+
+        Falls back to the default codec if the request does not give any or gives one which is not available
+        on this server, the codec actually used is given by the stats of the reply.
+
+        """
+        name = codec_options.name if codec_options.name != '' else default_name
+        if name not in Codec.get_available_names():
+            print("Debug: codec {0} not available, using {1}".format(name, default_name))
+            return Codec(name=default_name, shuffle=codec_options.shuffle, measure_decode=codec_options.measureDecode)
+        return Codec(name=name, level=codec_options.level, shuffle=codec_options.shuffle, measure_decode=codec_options.measureDecode)
+
+    @staticmethod
+    def shuffle_bytes(data, itemsize):
+        if itemsize <= 1 or len(data) % itemsize != 0:
+            return data
+        return np.frombuffer(data, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+
+    @staticmethod
+    def unshuffle_bytes(data, itemsize):
+        if itemsize <= 1 or len(data) % itemsize != 0:
+            return data
+        return np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1).T.tobytes()
+
+    def compress(self, data):
+        if self.name == 'zlib':
+            return zlib.compress(data, self.level)
+        if self.name == 'lz4':
+            return lz4_frame.compress(data, compression_level=self.level)
+        if self.name == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return data
+
+    def decompress(self, data):
+        if self.name == 'zlib':
+            return zlib.decompress(data)
+        if self.name == 'lz4':
+            return lz4_frame.decompress(data)
+        if self.name == 'zstd':
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def is_compressing(self):
+        return self.name != 'identity'
+
+    def encode(self, data, itemsize=1):
+        """Encode the given payload.
+
+        Args:
+            data (bytes): The payload.
+            itemsize (int): The size in bytes of the elements of the payload, used by the shuffle.
+
+        """
+        start_time = time.time()
+        if self.shuffle:
+            data_encoded = self.compress(data=Codec.shuffle_bytes(data=data, itemsize=itemsize))
+        else:
+            data_encoded = self.compress(data=data)
+        self.encode_time += time.time() - start_time
+        self.raw_size += len(data)
+        self.encoded_size += len(data_encoded)
+        if self.measure_decode:
+            self.decode(data=data_encoded, itemsize=itemsize)
+        return data_encoded
+
+    def decode(self, data, itemsize=1):
+        start_time = time.time()
+        data_decoded = self.decompress(data=data)
+        if self.shuffle:
+            data_decoded = Codec.unshuffle_bytes(data=data_decoded, itemsize=itemsize)
+        self.decode_time += time.time() - start_time
+        return data_decoded
+
+    def get_ratio(self):
+        return self.raw_size / self.encoded_size if self.encoded_size > 0 else 1
+
+    def get_stats(self):
+        print("Debug: {0} (level {1}, shuffle {2}) encoded {3} bytes into {4} bytes (ratio {5:.2f}) in {6} seconds".format(
+            self.name, self.level, self.shuffle, self.raw_size, self.encoded_size, self.get_ratio(), self.encode_time))
+        return s_pb2.CodecStats(codec=self.name,
+                                level=self.level,
+                                shuffle=self.shuffle,
+                                rawSize=self.raw_size,
+                                encodedSize=self.encoded_size,
+                                ratio=self.get_ratio(),
+                                encodeTime=self.encode_time,
+                                decodeTime=self.decode_time)
@@ -3,6 +3,24 @@ _MOUSE_EVENTS_THRESHOLD = 1
 _LOWER_LIMIT_RGB = 0
 _UPPER_LIMIT_RGB = 225
 _NO_EXPR_RGB = 166
+_NUMI_SCAN_BATCH_SIZE = 512
+_ROW_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_ANNO_CELLS_CACHE_SIZE = 32
+_CELL_ID_JOINS_CACHE_SIZE = 8
+_OPEN_LOOMS_LIMIT = 32
+_OPEN_LOOMS_MAX_BYTES = 4 * 1024 * 1024 * 1024
+_HDF5_CHUNK_CACHE_BYTES = 1024 * 1024
+_PREWARM_WORKERS = 4
+_FEATURES_CACHE_SIZE = 1024
+_FEATURES_CACHE_TTL = 10 * 60
+_SEARCH_CURSORS_LIMIT = 256
+_SEARCH_CURSOR_TTL = 60
+_FUZZY_SEARCH_CANDIDATES = 256
+_FUZZY_SEARCH_MAX_DISTANCE = 3
+_GENE_AXES_CACHE_SIZE = 16
+_FEATURE_STATS_BATCH_BYTES = 64 * 1024 * 1024
+_FEATURE_STATS_WORKERS = 1
+_NBYTES_SAMPLE_SIZE = 1000
 
 BIG_COLOR_LIST = ["ff0000", "ffc480", "149900", "307cbf", "d580ff", "cc0000", "bf9360", "1d331a", "79baf2", "deb6f2",
                   "990000", "7f6240", "283326", "2d4459", "8f00b3", "4c0000", "ccb499", "00f220", "accbe6", "520066",
@@ -2,10 +2,10 @@ import os
 from appdirs import AppDirs
 import time
 import uuid
-import pickle
 from pathlib import Path
 
 from scopeserver.dataserver.modules.gserver import GServer as gs
+from scopeserver.utils.GeneMappingStore import GeneMappingStore
 
 app_name = 'SCope'
 app_author = 'Aertslab'
@@ -25,7 +25,9 @@ data_dirs = {"Loom": {"path": os.path.join(platform_dirs.user_data_dir, "my-loom
              "Config": {"path": os.path.join(platform_dirs.user_config_dir),
                         "message": "No Config folder detected. Making Config folder: {0}.".format(str(os.path.join(platform_dirs.user_config_dir)))},
              "Logs": {"path": os.path.join(platform_dirs.user_log_dir),
-                      "message": "No Logs folder detected. Making Logs folder: {0}.".format(str(os.path.join(platform_dirs.user_log_dir)))}}
+                      "message": "No Logs folder detected. Making Logs folder: {0}.".format(str(os.path.join(platform_dirs.user_log_dir)))},
+             "Cache": {"path": os.path.join(platform_dirs.user_cache_dir, "loom-cache"),
+                       "message": "No Cache folder detected. Making Cache folder: {0}.".format(str(os.path.join(platform_dirs.user_cache_dir, "loom-cache")))}}
 
 class DataFileHandler():
 
@@ -42,6 +44,7 @@ class DataFileHandler():
         self.rankings_dir = DataFileHandler.get_data_dir_path_by_file_type(file_type="LoomAUCellRankings")
         self.config_dir = DataFileHandler.get_data_dir_path_by_file_type(file_type="Config")
         self.logs_dir = DataFileHandler.get_data_dir_path_by_file_type(file_type="Logs")
+        self.cache_dir = DataFileHandler.get_data_dir_path_by_file_type(file_type="Cache")
         self.create_global_dirs()
         self.create_uuid_log()
     
@@ -51,6 +54,9 @@ class DataFileHandler():
     def get_config_dir(self):
         return self.config_dir
 
+    def get_cache_dir(self):
+        return self.cache_dir
+
     def get_gobal_sets(self):
         return self.global_sets
 
@@ -133,6 +139,12 @@ class DataFileHandler():
 
     def load_gene_mappings(self):
         gene_mappings_dir_path = os.path.join(Path(__file__).parents[1], 'dataserver', 'data', 'gene_mappings') if self.dev_env else os.path.join(Path(__file__).parents[4], 'data', 'gene_mappings')
-        DataFileHandler.dmel_mappings = pickle.load(open(os.path.join(gene_mappings_dir_path, 'terminal_mappings.pickle'), 'rb'))
-        DataFileHandler.hsap_to_dmel_mappings = pickle.load(open(os.path.join(gene_mappings_dir_path, 'hsap_to_dmel_mappings.pickle'), 'rb'))
-        DataFileHandler.mmus_to_dmel_mappings = pickle.load(open(os.path.join(gene_mappings_dir_path, 'mmus_to_dmel_mappings.pickle'), 'rb'))
\ No newline at end of file
+        # Memory-mapped from the gene mapping store, converted from the pickles on first use
+        gene_mapping_store = GeneMappingStore(gene_mappings_dir_path=gene_mappings_dir_path, store_dir_path=os.path.join(self.cache_dir, 'gene-mappings'))
+        DataFileHandler.dmel_mappings, DataFileHandler.orthologue_tables = gene_mapping_store.load()
+        DataFileHandler.gene_mappings_id = gene_mapping_store.get_id()
+
+    @staticmethod
+    def get_orthologue_table(species):
+        """Get the <species>_to_dmel mapping (hsap or mmus), shared by all the .loom files."""
+        return DataFileHandler.orthologue_tables[species]
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class FeatureStats():
+
+    '''
+    FeatureStats class holds the statistics of all the features of a .loom over all its cells, under each transform:
+    - stats: a float64 (features x transforms x stats) array
+    - the features are the genes (in row order), followed by the regulons and the metrics (in the order of the meta data)
+    - TRANSFORMS: the (log_transform, cpm_normalise) of each transform
+    - STATS: the 99th percentile, the maximum, the mean and the fraction of non-zero values
+    Regulon AUC values are never transformed, their stats are the same under all the transforms.
+    '''
+
+    TRANSFORMS = [(False, False), (True, False), (False, True), (True, True)]
+    STATS = ['p99', 'max', 'mean', 'nonzero']
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @staticmethod
+    def get_percentile_and_max(vals, q=99):
+        """Get the q-th percentile (as np.percentile, linear interpolation) and the maximum of the values along the last axis.
+
+        A single np.partition is done instead of a sort and a separate scan for the maximum.
+
+        """
+        vals = np.asarray(vals)
+        n = vals.shape[-1]
+        position = (n - 1) * (q / 100)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, n - 1)
+        t = position - lower
+        partitioned = np.partition(vals, kth=sorted({lower, upper, n - 1}), axis=-1)
+        a = partitioned[..., lower]
+        b = partitioned[..., upper]
+        max_val = partitioned[..., n - 1]
+        # Same interpolation as np.percentile, NaNs are partitioned last and make the percentile NaN as with np.percentile
+        percentile = np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
+        percentile = np.where(np.isnan(max_val), max_val, percentile)
+        return percentile, max_val
+
+    @staticmethod
+    def to_vmax(p99, max_val):
+        # The 99th percentile, unless it is 0
+        vmax = p99
+        if vmax == 0 and max_val != 0:
+            vmax = max_val
+        if vmax == 0:
+            vmax = 0.01
+        return vmax, max_val
+
+    @staticmethod
+    def get_vmax(vals):
+        """Get the vmax (99th percentile, or the maximum if 0) and the maximum of the given values."""
+        p99, max_val = FeatureStats.get_percentile_and_max(vals=vals)
+        return FeatureStats.to_vmax(p99=p99.item(), max_val=max_val.item())
+
+    @staticmethod
+    def compute(vals):
+        """Compute the stats of each row of a (features x cells) array.
+
+        Returns:
+            numpy.ndarray: A float64 (features x stats) array.
+
+        """
+        stats = np.zeros((vals.shape[0], len(FeatureStats.STATS)), dtype=np.float64)
+        if vals.shape[1] == 0:
+            return stats
+        stats[:, 0], stats[:, 1] = FeatureStats.get_percentile_and_max(vals=vals)
+        stats[:, 2] = vals.mean(axis=1, dtype=np.float64)
+        stats[:, 3] = np.count_nonzero(vals, axis=1) / vals.shape[1]
+        return stats
+
+    @staticmethod
+    def get_transform_index(log_transform, cpm_normalise):
+        return FeatureStats.TRANSFORMS.index((bool(log_transform), bool(cpm_normalise)))
+
+    def get_stat(self, feature_index, stat, log_transform=True, cpm_normalise=False):
+        return self.stats[feature_index, FeatureStats.get_transform_index(log_transform=log_transform, cpm_normalise=cpm_normalise), FeatureStats.STATS.index(stat)].item()
+
+    def get_feature_vmax(self, feature_index, log_transform=True, cpm_normalise=False):
+        transform_index = FeatureStats.get_transform_index(log_transform=log_transform, cpm_normalise=cpm_normalise)
+        p99, max_val = self.stats[feature_index, transform_index, :2].tolist()
+        return FeatureStats.to_vmax(p99=p99, max_val=max_val)
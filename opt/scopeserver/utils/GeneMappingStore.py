@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import pickle
+import hashlib
+import numpy as np
+
+from scopeserver.utils.OrthologueTable import OrthologueTable
+
+
+class GeneMapping():
+
+    '''
+    GeneMapping class holds the terminal mapping (synonym -> dmel symbol) as sorted arrays:
+    - sources: the synonyms (utf-8), sorted
+    - target_indices: the index in targets of the dmel symbol of each synonym
+    - targets: the dmel symbols (utf-8)
+    The arrays are usually memory-mapped from the gene mapping store (see GeneMappingStore).
+    '''
+
+    ARRAY_NAMES = ['sources', 'target_indices', 'targets']
+
+    def __init__(self, sources, target_indices, targets):
+        self.sources = sources
+        self.target_indices = target_indices
+        self.targets = targets
+
+    @staticmethod
+    def compile(mappings):
+        """Compile a dict of synonym -> dmel symbol into the arrays of a GeneMapping."""
+        sources = sorted(mappings.keys())
+        targets, target_indices = np.unique(np.array([mappings[source] for source in sources], dtype=str), return_inverse=True)
+        return {"sources": GeneMapping.encode(symbols=sources),
+                "target_indices": target_indices.astype(np.int32).reshape(-1),
+                "targets": GeneMapping.encode(symbols=targets)}
+
+    @staticmethod
+    def encode(symbols):
+        return np.char.encode(np.asarray(symbols, dtype=str), 'utf-8')
+
+    def __len__(self):
+        return len(self.sources)
+
+    def __contains__(self, symbol):
+        return self.get_source_indices(symbols=[symbol])[0] >= 0
+
+    def __getitem__(self, symbol):
+        source_index = self.get_source_indices(symbols=[symbol])[0]
+        if source_index < 0:
+            raise KeyError(symbol)
+        return self.targets[self.target_indices[source_index]].decode('utf-8')
+
+    def get_source_indices(self, symbols):
+        # Index in sources of each of the given symbols, -1 if absent
+        symbols = GeneMapping.encode(symbols=symbols)
+        if len(self.sources) == 0 or len(symbols) == 0:
+            return np.full(len(symbols), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.sources, symbols), len(self.sources) - 1)
+        return np.where(self.sources[positions] == symbols, positions, -1)
+
+    def contains(self, symbols):
+        return self.get_source_indices(symbols=symbols) >= 0
+
+    def get_targets(self, symbols):
+        """Get the dmel symbol of each of the given symbols, None if the symbol is not in the mapping."""
+        source_indices = self.get_source_indices(symbols=symbols)
+        found = source_indices >= 0
+        targets = np.full(len(source_indices), None, dtype=object)
+        targets[found] = np.char.decode(self.targets[self.target_indices[source_indices[found]]], 'utf-8')
+        return targets
+
+    def get_mappings_of(self, symbols):
+        """Get the synonyms which are or map to any of the given symbols, with their dmel symbol.
+
+        Returns:
+            tuple: The synonyms (sorted) and their dmel symbols, as lists of str.
+
+        """
+        symbols = np.unique(GeneMapping.encode(symbols=symbols))
+        is_selected = np.isin(self.sources, symbols)
+        is_selected |= np.isin(self.targets, symbols)[self.target_indices]
+        source_indices = np.flatnonzero(is_selected)
+        return (np.char.decode(self.sources[source_indices], 'utf-8').tolist(),
+                np.char.decode(self.targets[self.target_indices[source_indices]], 'utf-8').tolist())
+
+
+class GeneMappingStore():
+
+    '''
+    GeneMappingStore class converts the gene mapping pickles once into .npy files which are then memory-mapped,
+    so that loading them is near-instant and their pages are shared by all the server processes:
+    - terminal_mappings.pickle -> dmel.<array>.npy (GeneMapping)
+    - <species>_to_dmel_mappings.pickle -> <species>.<array>.npy (OrthologueTable)
+    A manifest records the pickles the store was converted from, the store is converted again when they change.
+    '''
+
+    VERSION = 1
+    ORTHOLOGUE_SPECIES = ['hsap', 'mmus']
+
+    def __init__(self, gene_mappings_dir_path, store_dir_path):
+        self.gene_mappings_dir_path = gene_mappings_dir_path
+        self.store_dir_path = store_dir_path
+
+    def get_pickle_file_path(self, species):
+        file_name = 'terminal_mappings.pickle' if species == 'dmel' else '{0}_to_dmel_mappings.pickle'.format(species)
+        return os.path.join(self.gene_mappings_dir_path, file_name)
+
+    def get_array_file_path(self, species, array_name):
+        return os.path.join(self.store_dir_path, '{0}.{1}.npy'.format(species, array_name))
+
+    def get_manifest_file_path(self):
+        return os.path.join(self.store_dir_path, 'manifest.json')
+
+    def get_source_manifest(self):
+        manifest = {"version": GeneMappingStore.VERSION}
+        for species in ['dmel'] + GeneMappingStore.ORTHOLOGUE_SPECIES:
+            file_stat = os.stat(self.get_pickle_file_path(species=species))
+            manifest[species] = [file_stat.st_size, file_stat.st_mtime_ns]
+        return manifest
+
+    def get_id(self):
+        # Changes whenever the store is converted from different pickles
+        return hashlib.md5(json.dumps(self.get_source_manifest(), sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_up_to_date(self):
+        try:
+            with open(self.get_manifest_file_path(), 'r') as fh:
+                return json.load(fh) == self.get_source_manifest()
+        except (OSError, ValueError):
+            return False
+
+    def save_arrays(self, species, arrays):
+        for array_name, arr in arrays.items():
+            array_file_path = self.get_array_file_path(species=species, array_name=array_name)
+            tmp_file_path = array_file_path + '.{0}.tmp'.format(os.getpid())
+            with open(tmp_file_path, 'wb') as fh:
+                np.save(fh, arr, allow_pickle=False)
+            os.replace(tmp_file_path, array_file_path)
+
+    def load_arrays(self, species, array_names):
+        return {array_name: np.load(self.get_array_file_path(species=species, array_name=array_name), mmap_mode='r', allow_pickle=False) for array_name in array_names}
+
+    def load_pickle(self, species):
+        with open(self.get_pickle_file_path(species=species), 'rb') as fh:
+            return pickle.load(fh)
+
+    def convert(self):
+        print("Converting the gene mappings from {0} into {1}...".format(self.gene_mappings_dir_path, self.store_dir_path))
+        os.makedirs(self.store_dir_path, exist_ok=True)
+        # Written last, so that an interrupted conversion is done again
+        if os.path.exists(self.get_manifest_file_path()):
+            os.remove(self.get_manifest_file_path())
+        source_manifest = self.get_source_manifest()
+        self.save_arrays(species='dmel', arrays=GeneMapping.compile(mappings=self.load_pickle(species='dmel')))
+        for species in GeneMappingStore.ORTHOLOGUE_SPECIES:
+            self.save_arrays(species=species, arrays=OrthologueTable.compile(mappings=self.load_pickle(species=species)))
+        with open(self.get_manifest_file_path(), 'w') as fh:
+            json.dump(source_manifest, fh)
+
+    def load(self):
+        """Load the gene mappings, converting them first if needed.
+
+        Returns:
+            tuple: The dmel GeneMapping and a dict of species -> OrthologueTable.
+
+        """
+        if not self.is_up_to_date():
+            self.convert()
+        dmel_mapping = GeneMapping(**self.load_arrays(species='dmel', array_names=GeneMapping.ARRAY_NAMES))
+        orthologue_tables = {species: OrthologueTable(**self.load_arrays(species=species, array_names=OrthologueTable.ARRAY_NAMES)) for species in GeneMappingStore.ORTHOLOGUE_SPECIES}
+        return dmel_mapping, orthologue_tables
+
+
+if __name__ == '__main__':
+    # python -m scopeserver.utils.GeneMappingStore <gene mappings folder> <store folder>
+    if len(sys.argv) != 3:
+        print("Usage: python -m scopeserver.utils.GeneMappingStore <gene mappings folder> <store folder>")
+        sys.exit(1)
+    GeneMappingStore(gene_mappings_dir_path=sys.argv[1], store_dir_path=sys.argv[2]).convert()
@@ -1,33 +1,266 @@
+import os
+import sys
 import numpy as np
 import json
 import zlib
 import base64
-from functools import lru_cache
+import hashlib
+import itertools
+import threading
 import pandas as pd
 import time
+from concurrent import futures
+from collections import OrderedDict
 
 from scopeserver.utils import DataFileHandler as dfh
+from scopeserver.utils import Constant
+from scopeserver.utils.RowCache import RowCache
+from scopeserver.utils.SingleFlight import SingleFlight
+from scopeserver.utils.FeatureStats import FeatureStats
+from scopeserver.utils import SearchSpace as ss
 
 class Loom():
 
+    # Expression rows shared by all the .loom files, bounded by a single memory budget
+    row_cache = RowCache(max_bytes=Constant._ROW_CACHE_MAX_BYTES)
+    # Search indexes of the orthologue tables, shared by all the dmel .loom files
+    cross_species_search_indexes = {}
+    cross_species_index_builds = SingleFlight()
+    # Species, synonyms and gene index by gene axis, shared by the .loom files having the same genes
+    gene_axes = OrderedDict()
+    gene_axes_lock = threading.Lock()
+    gene_axis_builds = SingleFlight()
+    # Bytes held by the structures shared by several .loom files (gene axes, cross-species search indexes), counted once
+    shared_bytes = {}
+    shared_bytes_lock = threading.Lock()
+    # Feature stats scans of all the .loom files, run a few at a time (see start_feature_stats)
+    feature_stats_executor = futures.ThreadPoolExecutor(max_workers=Constant._FEATURE_STATS_WORKERS)
+    feature_stats_shutdown = threading.Event()
+
     def __init__(self, partial_md5_hash, file_path, abs_file_path, loom_connection):
         self.partial_md5_hash = partial_md5_hash
         self.file_path = file_path
         self.abs_file_path = abs_file_path
         self.loom_connection = loom_connection
         print("New .loom created.")
+        # Meta data
+        self.meta_data = None
+        self.md_annotations_by_name = {}
+        self.md_clusterings_by_id = {}
+        self.md_regulons_by_name = {}
         # Metrics
         self.nUMI = None
+        # Genes
+        self.genes = None
+        self.gene_axis = None
+        # Cells
+        self.cell_ids = None
+        self.cell_id_index = None
+        self.cell_id_joins = OrderedDict()
+        # Regulons
+        self.regulon_names = None
+        self.regulon_index = None
+        self.regulons_AUC = None
+        # Embeddings
+        self.embeddings = {}
+        self.default_embedding_source = None
+        # Clusterings
+        self.clusterings = {}
+        self.cluster_markers = {}
+        # Annotations
+        self.anno_codes = {}
+        self.anno_cells = OrderedDict()
+        self.anno_cells_lock = threading.Lock()
+        # Search
+        self.search_indexes = {}
+        # Feature stats, computed in the background (see start_feature_stats)
+        self.feature_stats = None
+        self.feature_stats_future = None
+        self.feature_stats_stop = threading.Event()
+        # Concurrent requests needing the same index share a single build
+        self.index_builds = SingleFlight()
+        # Leases taken by the requests (and background tasks) using this .loom, it is only closed once evicted and no longer used
+        self.leases = 0
+        self.evicted = False
+        self.closed = False
+        self.leases_lock = threading.Lock()
+        # Bytes held by each cached attribute and index, counted once when it is cached (see set_cached_bytes)
+        self.cached_bytes = {}
+        self.cached_bytes_total = 0
+        self.cached_bytes_lock = threading.Lock()
+        # Called when the caches grow, so that the open looms can be checked against their memory budget
+        self.on_cache_growth = None
 
     def get_connection(self):
         return self.loom_connection
 
+    def acquire(self):
+        """Take a lease on this .loom, which then stays open until the lease is released.
+
+        Returns:
+            bool: False if the .loom has already been closed.
+
+        """
+        with self.leases_lock:
+            if self.closed:
+                return False
+            self.leases += 1
+            return True
+
+    def release(self):
+        with self.leases_lock:
+            self.leases -= 1
+            is_closing = self.evicted and self.leases == 0 and not self.closed
+            self.closed = self.closed or is_closing
+        if is_closing:
+            self.close()
+
+    def evict(self):
+        # Close this .loom as soon as it is no longer used
+        self.feature_stats_stop.set()
+        with self.leases_lock:
+            self.evicted = True
+            is_closing = self.leases == 0 and not self.closed
+            self.closed = self.closed or is_closing
+        if is_closing:
+            self.close()
+        else:
+            print("Debug: {0} still used by {1} requests, closing it once they are done...".format(self.get_abs_file_path(), self.leases))
+
+    def close(self):
+        print("Debug: closing {0}...".format(self.get_abs_file_path()))
+        self.feature_stats_stop.set()
+        self.loom_connection.close()
+        Loom.row_cache.invalidate(partial_md5_hash=self.partial_md5_hash)
+
+    @staticmethod
+    def get_nbytes(obj, sample_size=Constant._NBYTES_SAMPLE_SIZE):
+        # Memory-mapped arrays are backed by the page cache rather than by the process memory
+        if isinstance(obj, np.memmap):
+            return 0
+        if isinstance(obj, np.ndarray):
+            return obj.nbytes
+        if isinstance(obj, dict):
+            items = obj.items()
+        elif isinstance(obj, (list, tuple)):
+            items = obj
+        else:
+            return sys.getsizeof(obj)
+        # The elements of large containers are estimated from the first sample_size ones
+        sample = list(itertools.islice(items, sample_size))
+        if len(sample) == 0:
+            return sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            sample_nbytes = sum(Loom.get_nbytes(k) + Loom.get_nbytes(v) for k, v in sample)
+        else:
+            sample_nbytes = sum(Loom.get_nbytes(x) for x in sample)
+        return sys.getsizeof(obj) + sample_nbytes * len(obj) // len(sample)
+
+    def set_cached_bytes(self, key, obj):
+        """Account for the bytes held by the object cached under the given key (None once it is dropped from the cache).
+
+        The size of an object is estimated once when it is cached, get_memory_footprint only sums up the running total.
+
+        """
+        nbytes = Loom.get_nbytes(obj) if obj is not None else 0
+        with self.cached_bytes_lock:
+            growth = nbytes - self.cached_bytes.pop(key, 0)
+            if obj is not None:
+                self.cached_bytes[key] = nbytes
+            self.cached_bytes_total += growth
+        if growth > 0 and self.on_cache_growth is not None:
+            self.on_cache_growth()
+
+    @staticmethod
+    def set_shared_bytes(key, obj):
+        with Loom.shared_bytes_lock:
+            if obj is None:
+                Loom.shared_bytes.pop(key, None)
+            else:
+                Loom.shared_bytes[key] = Loom.get_nbytes(obj)
+
+    @staticmethod
+    def get_shared_memory_footprint():
+        """Estimate the number of bytes held by the structures shared by the .loom files (gene axes, cross-species search indexes)."""
+        with Loom.shared_bytes_lock:
+            return sum(Loom.shared_bytes.values())
+
+    def get_matrix_chunk_rows(self):
+        # Number of rows of the HDF5 chunks of the main matrix, 1 if it is not chunked
+        try:
+            chunks = self.loom_connection._file['matrix'].chunks
+        except (AttributeError, KeyError):
+            return 1
+        return chunks[0] if chunks is not None else 1
+
+    def get_hdf5_chunk_cache_size(self):
+        try:
+            return self.loom_connection._file.id.get_access_plist().get_cache()[2]
+        except AttributeError:
+            return Constant._HDF5_CHUNK_CACHE_BYTES
+
+    def get_memory_footprint(self):
+        """Estimate the number of bytes held by this .loom: the HDF5 chunk cache and all the cached attributes and indexes.
+
+        Expression rows are accounted for by the shared row cache, the structures shared with other .loom files
+        by get_shared_memory_footprint.
+
+        """
+        with self.cached_bytes_lock:
+            return self.get_hdf5_chunk_cache_size() + self.cached_bytes_total
+
     def get_file_path(self):
         return self.file_path
 
     def get_abs_file_path(self):
         return self.abs_file_path
 
+    def get_cache_file_path(self, suffix, cache_key=None):
+        cache_dir = dfh.DataFileHandler.get_data_dir_path_by_file_type(file_type="Cache")
+        return os.path.join(cache_dir, "{0}.{1}".format(cache_key if cache_key is not None else self.partial_md5_hash, suffix))
+
+    def load_cache_json(self, suffix, cache_key=None):
+        cache_file_path = self.get_cache_file_path(suffix=suffix, cache_key=cache_key)
+        if not os.path.exists(cache_file_path):
+            return None
+        try:
+            with open(cache_file_path, 'r') as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as e:
+            print("Warning: could not read the cache file {0}: {1}".format(cache_file_path, e))
+            return None
+
+    def save_cache_json(self, suffix, obj, cache_key=None):
+        cache_file_path = self.get_cache_file_path(suffix=suffix, cache_key=cache_key)
+        tmp_cache_file_path = "{0}.{1}.tmp".format(cache_file_path, os.getpid())
+        try:
+            with open(tmp_cache_file_path, 'w') as fh:
+                json.dump(obj, fh)
+            os.replace(tmp_cache_file_path, cache_file_path)
+        except OSError as e:
+            print("Warning: could not write the cache file {0}: {1}".format(cache_file_path, e))
+
+    def load_cache_array(self, suffix, mmap_mode=None):
+        cache_file_path = self.get_cache_file_path(suffix=suffix)
+        if not os.path.exists(cache_file_path):
+            return None
+        try:
+            return np.load(cache_file_path, mmap_mode=mmap_mode)
+        except (OSError, ValueError) as e:
+            print("Warning: could not read the cache file {0}: {1}".format(cache_file_path, e))
+            return None
+
+    def save_cache_array(self, suffix, arr):
+        # Write to a temporary file first so that a partially written file is never picked up
+        cache_file_path = self.get_cache_file_path(suffix=suffix)
+        tmp_cache_file_path = "{0}.{1}.tmp".format(cache_file_path, os.getpid())
+        try:
+            with open(tmp_cache_file_path, 'wb') as fh:
+                np.save(fh, arr)
+            os.replace(tmp_cache_file_path, cache_file_path)
+        except OSError as e:
+            print("Warning: could not write the cache file {0}: {1}".format(cache_file_path, e))
+
     def get_global_attribute_by_name(self, name):
         if name not in self.loom_connection.attrs.keys():
             raise AttributeError("The global attribute {0} does not exist in the .loom file.".format(name))
@@ -52,7 +285,63 @@ class Loom():
         return arr
 
     def get_cell_ids(self):
-        return self.loom_connection.ca["CellID"]
+        if self.cell_ids is None:
+            self.cell_ids = self.loom_connection.ca["CellID"]
+            self.set_cached_bytes(key="cell_ids", obj=self.cell_ids)
+        return self.cell_ids
+
+    def get_cell_id_index(self):
+        """Index the cell IDs for vectorised lookups.
+
+        Returns:
+            tuple: The sorted cell IDs, the position in the .loom of each sorted cell ID and whether the cell IDs are unique.
+
+        """
+        if self.cell_id_index is None:
+            self.index_builds.do(key="cell_id_index", fn=self.build_cell_id_index)
+        return self.cell_id_index
+
+    def build_cell_id_index(self):
+        if self.cell_id_index is not None:
+            return
+        cell_ids = self.get_cell_ids()
+        # A stable sort keeps the first occurrence of a duplicated cell ID first
+        sorter = np.argsort(cell_ids, kind='mergesort')
+        sorted_cell_ids = cell_ids[sorter]
+        self.cell_id_index = (sorted_cell_ids, sorter, bool(np.all(sorted_cell_ids[1:] != sorted_cell_ids[:-1])))
+        self.set_cached_bytes(key="cell_id_index", obj=self.cell_id_index)
+
+    def get_cell_indices_by_ids(self, cell_ids):
+        # Index of each of the given cell IDs in the .loom, -1 if the cell ID is absent
+        sorted_cell_ids, sorter, _ = self.get_cell_id_index()
+        cell_ids = np.asarray(cell_ids)
+        if len(sorted_cell_ids) == 0:
+            return np.full(len(cell_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(sorted_cell_ids, cell_ids), len(sorted_cell_ids) - 1)
+        return np.where(sorted_cell_ids[positions] == cell_ids, sorter[positions], -1)
+
+    def get_cell_ids_join(self, dest_loom):
+        # Index in dest_loom of each cell of this .loom (-1 if absent), cached for the last compared looms
+        cell_ids_join = self.cell_id_joins.get(dest_loom.partial_md5_hash)
+        if cell_ids_join is None:
+            cell_ids_join = dest_loom.get_cell_indices_by_ids(cell_ids=self.get_cell_ids())
+            self.cell_id_joins[dest_loom.partial_md5_hash] = cell_ids_join
+            self.set_cached_bytes(key=("cell_id_join", dest_loom.partial_md5_hash), obj=cell_ids_join)
+            while len(self.cell_id_joins) > Constant._CELL_ID_JOINS_CACHE_SIZE:
+                partial_md5_hash, _ = self.cell_id_joins.popitem(last=False)
+                self.set_cached_bytes(key=("cell_id_join", partial_md5_hash), obj=None)
+        return cell_ids_join
+
+    def translate_cell_indices(self, cell_indices, dest_loom):
+        """Get the sorted indices of the cells in dest_loom having the same cell IDs as the given cells of this .loom."""
+        cell_indices = np.asarray(cell_indices, dtype=np.int64)
+        _, _, has_unique_cell_ids = dest_loom.get_cell_id_index()
+        if has_unique_cell_ids:
+            dest_cell_indices = self.get_cell_ids_join(dest_loom=dest_loom)[cell_indices]
+            return np.unique(dest_cell_indices[dest_cell_indices >= 0]).astype(np.int32)
+        # Cell IDs can match several cells of dest_loom
+        dest_mask = np.isin(dest_loom.get_cell_ids(), self.get_cell_ids()[cell_indices])
+        return np.flatnonzero(dest_mask).astype(np.int32)
 
     #############
     # Meta Data #
@@ -111,6 +400,12 @@ class Loom():
                         "clusters": clusters
                     })
         loom.attrs['MetaData'] = base64.b64encode(zlib.compress(json.dumps(metaJson).encode('ascii'))).decode('ascii')
+        # Parse the new meta data on next access
+        self.meta_data = None
+        self.set_cached_bytes(key="meta_data", obj=None)
+        for cross_species in self.search_indexes.keys():
+            self.set_cached_bytes(key=("search_index", cross_species), obj=None)
+        self.search_indexes = {}
         # self.change_loom_mode(loom_file_path, rw=False)
 
     def get_file_metadata(self):
@@ -144,27 +439,30 @@ class Loom():
         return meta
 
     def get_meta_data_annotation_by_name(self, name):
-        md_annotations = self.get_meta_data_by_key(key="annotations")
-        md_annotation = list(filter(lambda x: x["name"] == name, md_annotations))
+        self.get_meta_data()
+        md_annotation = self.md_annotations_by_name.get(name, [])
         if(len(md_annotation) > 1):
             raise ValueError('Multiple annotations matches the given name: {0}'.format(name))
         return md_annotation[0]
 
     def get_meta_data_clustering_by_id(self, id):
-        md_clusterings = self.get_meta_data_by_key(key="clusterings")
-        md_clustering = list(filter(lambda x: x["id"] == id, md_clusterings))
+        self.get_meta_data()
+        md_clustering = self.md_clusterings_by_id.get(id, [])
         if(len(md_clustering) > 1):
             raise ValueError('Multiple clusterings matches the given id: {0}'.format(id))
         return md_clustering[0]
 
+    def get_meta_data_regulon_by_name(self, name):
+        self.get_meta_data()
+        md_regulon = self.md_regulons_by_name.get(name, [])
+        if(len(md_regulon) == 0):
+            raise ValueError('No regulon thresholds match the given name: {0}'.format(name))
+        return md_regulon[0]
+
     def get_meta_data_by_key(self, key):
         meta_data = self.get_meta_data()
         if key in meta_data.keys():
-            md = meta_data[key]
-            if key == "embeddings":
-                for e in md:  # Fix for malformed embeddings json (R problem)
-                    e['id'] = int(e['id'])
-            return md
+            return meta_data[key]
         return []
 
     @staticmethod
@@ -195,9 +493,14 @@ class Loom():
         return False
 
     def has_meta_data(self):
-        return "MetaData" in self.loom_connection.attrs.keys()
+        return self.meta_data is not None or "MetaData" in self.loom_connection.attrs.keys()
 
     def get_meta_data(self):
+        if self.meta_data is None:
+            self.set_meta_data(meta_data=self.read_meta_data())
+        return self.meta_data
+
+    def read_meta_data(self):
         md = self.loom_connection.attrs.MetaData
         if type(md) is np.ndarray:
             md = self.loom_connection.attrs.MetaData[0]
@@ -206,61 +509,197 @@ class Loom():
         except json.decoder.JSONDecodeError:
             return Loom.decompress_meta(meta=md)
 
+    @staticmethod
+    def group_meta_data_by(md_items, key):
+        md_items_by_key = {}
+        for md_item in md_items:
+            md_items_by_key.setdefault(md_item[key], []).append(md_item)
+        return md_items_by_key
+
+    def set_meta_data(self, meta_data):
+        for e in meta_data.get("embeddings", []):  # Fix for malformed embeddings json (R problem)
+            e['id'] = int(e['id'])
+        self.md_annotations_by_name = Loom.group_meta_data_by(md_items=meta_data.get("annotations", []), key="name")
+        self.md_clusterings_by_id = Loom.group_meta_data_by(md_items=meta_data.get("clusterings", []), key="id")
+        self.md_regulons_by_name = Loom.group_meta_data_by(md_items=meta_data.get("regulonThresholds", []), key="regulon")
+        self.meta_data = meta_data
+        self.set_cached_bytes(key="meta_data", obj=meta_data)
+
     def get_nb_cells(self):
         return self.loom_connection.shape[1]
 
     def get_genes(self):
-        return self.loom_connection.ra.Gene.astype(str)
+        if self.genes is None:
+            self.genes = self.loom_connection.ra.Gene.astype(str)
+            self.set_cached_bytes(key="genes", obj=self.genes)
+        return self.genes
 
-    @lru_cache(maxsize=32)
-    def infer_species(self):
-        genes = set(self.get_genes())
-        maxPerc = 0.0
-        maxSpecies = ''
+    def get_gene_axis_hash(self):
+        genes = "\n".join(self.get_genes().tolist()).encode('utf-8')
+        return hashlib.md5(dfh.DataFileHandler.gene_mappings_id.encode('utf-8') + genes).hexdigest()
+
+    def get_gene_axis(self):
+        """Get the inferred species ("species"), the synonyms ("geneNames") and the gene index ("geneIndex") of the genes of this .loom.
+
+        They are shared by the .loom files having the same genes (in the same order), in memory and through a cache file
+        keyed by the hash of the genes.
+
+        """
+        if self.gene_axis is None:
+            self.index_builds.do(key="gene_axis", fn=self.build_gene_axis)
+        return self.gene_axis
+
+    def build_gene_axis(self):
+        if self.gene_axis is not None:
+            return
+        gene_axis_hash = self.get_gene_axis_hash()
+        with Loom.gene_axes_lock:
+            gene_axis = Loom.gene_axes.get(gene_axis_hash)
+        if gene_axis is None:
+            gene_axis = Loom.gene_axis_builds.do(key=gene_axis_hash, fn=self.load_gene_axis, gene_axis_hash=gene_axis_hash)
+        self.gene_axis = gene_axis
+
+    def load_gene_axis(self, gene_axis_hash):
+        with Loom.gene_axes_lock:
+            gene_axis = Loom.gene_axes.get(gene_axis_hash)
+        if gene_axis is not None:
+            return gene_axis
+        gene_axis = self.load_cache_json(suffix="genes.json", cache_key=gene_axis_hash)
+        if gene_axis is None:
+            species = self.compute_species()
+            gene_names = self.compute_gene_names(species=species)
+            gene_axis = {"species": species,
+                         "geneNames": gene_names,
+                         "geneIndex": self.compute_gene_index(gene_names=gene_names)}
+            self.save_cache_json(suffix="genes.json", obj=gene_axis, cache_key=gene_axis_hash)
+        # Shared by the .loom files having the same genes, counted once
+        Loom.set_shared_bytes(key=("gene_axis", gene_axis_hash), obj=gene_axis)
+        with Loom.gene_axes_lock:
+            Loom.gene_axes[gene_axis_hash] = gene_axis
+            while len(Loom.gene_axes) > Constant._GENE_AXES_CACHE_SIZE:
+                evicted_gene_axis_hash, _ = Loom.gene_axes.popitem(last=False)
+                Loom.set_shared_bytes(key=("gene_axis", evicted_gene_axis_hash), obj=None)
+        return gene_axis
+
+    def get_gene_index(self):
+        """Map each gene symbol (and each synonym resolved by get_gene_names) to its row in the .loom.
+
+        Returns:
+            dict: gene symbol -> row index. The first row wins when a gene symbol is duplicated.
+
+        """
+        return self.get_gene_axis()["geneIndex"]
+
+    def compute_gene_index(self, gene_names):
+        gene_index = {}
+        for row, gene in enumerate(self.get_genes().tolist()):
+            gene_index.setdefault(gene, row)
+        for synonym, gene in gene_names.items():
+            if synonym not in gene_index:
+                gene_index[synonym] = gene_index[gene]
+        return gene_index
+
+    def get_gene_row_index(self, gene_symbol):
+        return self.get_gene_index()[gene_symbol]
+
+    @staticmethod
+    def get_species_gene_mappings(species):
         mappings = {
             'dmel': dfh.DataFileHandler.dmel_mappings
         }
-        for species in mappings.keys():
-            intersect = genes.intersection(mappings[species].keys())
-            if (len(intersect) / len(genes)) > maxPerc:
-                maxPerc = (len(intersect) / len(genes))
+        return mappings.get(species, {})
+
+    def infer_species(self):
+        species = self.get_gene_axis()["species"]
+        return species, Loom.get_species_gene_mappings(species=species)
+
+    def compute_species(self):
+        genes = np.unique(self.get_genes())
+        maxPerc = 0.0
+        maxSpecies = ''
+        for species in ['dmel']:
+            perc = np.count_nonzero(Loom.get_species_gene_mappings(species=species).contains(symbols=genes)) / len(genes)
+            if perc > maxPerc:
+                maxPerc = perc
                 maxSpecies = species
         if maxPerc < 0.5:
-            return 'Unknown', {}
-        return maxSpecies, mappings[maxSpecies]
+            return 'Unknown'
+        return maxSpecies
+
+    def get_anno_codes(self, anno_name):
+        """Encode an annotation (or a clustering when anno_name is Clustering_<id>) as categorical codes.
+
+        Returns:
+            tuple: The sorted categories (as str) and an int32 array with the category index of each cell.
+
+        """
+        if anno_name not in self.anno_codes:
+            self.index_builds.do(key=("anno_codes", anno_name), fn=self.build_anno_codes, anno_name=anno_name)
+        return self.anno_codes[anno_name]
+
+    def build_anno_codes(self, anno_name):
+        if anno_name in self.anno_codes:
+            return
+        if anno_name.startswith("Clustering_"):
+            values = self.get_clustering_by_id(clustering_id=anno_name.split('_')[1])
+        else:
+            values = self.loom_connection.ca[anno_name]
+        categories, codes = np.unique(np.asarray(values).astype(str), return_inverse=True)
+        self.anno_codes[anno_name] = (categories, codes.astype(np.int32).reshape(-1))
+        self.set_cached_bytes(key=("anno_codes", anno_name), obj=self.anno_codes[anno_name])
 
     def get_anno_cells(self, annotations, logic='OR'):
-        loom = self.loom_connection
-        cell_indices = []
+        if logic not in ['AND', 'OR']:
+            logic = 'OR'
+        anno_filter = (tuple((anno.name, tuple(anno.values)) for anno in annotations), logic)
+        with self.anno_cells_lock:
+            cell_indices = self.anno_cells.get(anno_filter)
+            if cell_indices is not None:
+                self.anno_cells.move_to_end(anno_filter)
+                return cell_indices
+        cells_mask = None
         for anno in annotations:
-            anno_name = anno.name
+            categories, codes = self.get_anno_codes(anno_name=anno.name)
             for annotation_value in anno.values:
-                anno_set = set()
-                if anno_name.startswith("Clustering_"):
-                    clustering_id = str(anno_name.split('_')[1])
-                    [anno_set.add(x) for x in np.where(loom.ca.Clusterings[clustering_id] == annotation_value)[0]]
+                category = np.searchsorted(categories, str(annotation_value))
+                if category < len(categories) and categories[category] == str(annotation_value):
+                    value_mask = codes == category
                 else:
-                    [anno_set.add(x) for x in np.where(loom.ca[anno_name].astype(str) == str(annotation_value))[0]]
-                cell_indices.append(anno_set)
-        if logic not in ['AND', 'OR']:
-            logic = 'OR'
-        if logic == 'AND':
-            return sorted(list(set.intersection(*cell_indices)))
-        elif logic == 'OR':
-            return sorted(list(set.union(*cell_indices)))
+                    value_mask = np.zeros(len(codes), dtype=bool)
+                if cells_mask is None:
+                    cells_mask = value_mask
+                elif logic == 'AND':
+                    np.logical_and(cells_mask, value_mask, out=cells_mask)
+                else:
+                    np.logical_or(cells_mask, value_mask, out=cells_mask)
+        if cells_mask is None:
+            cells_mask = np.ones(self.get_nb_cells(), dtype=bool)
+        cell_indices = np.flatnonzero(cells_mask).astype(np.int32)
+        cell_indices.setflags(write=False)
+        # Concurrent requests update the cache, its byte count is updated along under the same lock
+        with self.anno_cells_lock:
+            self.anno_cells[anno_filter] = cell_indices
+            self.set_cached_bytes(key=("anno_cells", anno_filter), obj=cell_indices)
+            while len(self.anno_cells) > Constant._ANNO_CELLS_CACHE_SIZE:
+                evicted_anno_filter, _ = self.anno_cells.popitem(last=False)
+                self.set_cached_bytes(key=("anno_cells", evicted_anno_filter), obj=None)
+        return cell_indices
 
-    @lru_cache(maxsize=8)
     def get_gene_names(self):
+        return self.get_gene_axis()["geneNames"]
+
+    def compute_gene_names(self, species):
         genes = self.get_genes()
         conversion = {}
-        species, geneMappings = self.infer_species()
-        for gene in genes:
-            gene = str(gene)
-            try:
-                if geneMappings[gene] != gene:
-                    conversion[geneMappings[gene]] = gene
-            except KeyError:
+        geneMappings = Loom.get_species_gene_mappings(species=species)
+        if len(geneMappings) == 0:
+            return conversion
+        mapped_genes = geneMappings.get_targets(symbols=genes)
+        for gene, mapped_gene in zip(genes.tolist(), mapped_genes.tolist()):
+            if mapped_gene is None:
                 print("ERROR: Gene: {0} is not in the mapping table!".format(gene))
+            elif mapped_gene != gene:
+                conversion[mapped_gene] = gene
         return conversion
 
     ##############
@@ -268,36 +707,93 @@ class Loom():
     ##############
 
     def get_nUMI(self):
+        if self.nUMI is None:
+            self.index_builds.do(key="nUMI", fn=self.build_nUMI)
+        return self.nUMI
+
+    def build_nUMI(self):
         if self.nUMI is not None:
-            return self.nUMI
+            return
         if self.has_ca_attr(name="nUMI"):
-            return self.loom_connection.ca.nUMI
-        # Compute nUMI on the fly
-        calc_nUMI_start_time = time.time()
-        self.nUMI = self.loom_connection[:,:].sum(axis=0)
-        print("Debug: %s seconds elapsed (calculating nUMI) ---" % (time.time() - calc_nUMI_start_time))
-        return self.nUMI
+            self.nUMI = self.loom_connection.ca.nUMI
+            self.set_cached_bytes(key="nUMI", obj=self.nUMI)
+            return
+        # Reuse the nUMI computed for the same file by a previous run
+        nUMI = self.load_cache_array(suffix="nUMI.npy")
+        if nUMI is None:
+            # Compute nUMI on the fly
+            calc_nUMI_start_time = time.time()
+            nUMI = self.compute_nUMI()
+            print("Debug: %s seconds elapsed (calculating nUMI) ---" % (time.time() - calc_nUMI_start_time))
+            self.save_cache_array(suffix="nUMI.npy", arr=nUMI)
+        self.nUMI = nUMI
+        self.set_cached_bytes(key="nUMI", obj=nUMI)
+
+    def compute_nUMI(self, batch_size=Constant._NUMI_SCAN_BATCH_SIZE):
+        # Scan the matrix by blocks of cells so that only genes x batch_size values are in memory at once
+        n_cells = self.get_nb_cells()
+        nUMI = np.zeros(n_cells, dtype=np.float64)
+        for start in range(0, n_cells, batch_size):
+            end = min(start + batch_size, n_cells)
+            nUMI[start:end] = self.loom_connection[:, start:end].sum(axis=0)
+        return nUMI
 
     def get_gene_expression_by_gene_symbol(self, gene_symbol):
-        return self.loom_connection[self.get_genes() == gene_symbol, :][0]
+        return self.loom_connection[self.get_gene_row_index(gene_symbol=gene_symbol), :]
 
     def get_gene_expression(self, gene_symbol, log_transform=True, cpm_normalise=False, annotation='', logic='OR'):
-        if gene_symbol not in set(self.get_genes()):
-            gene_symbol = self.get_gene_names()[gene_symbol]
-        print("Debug: getting expression of " + gene_symbol + "...")
-        gene_expr = self.get_gene_expression_by_gene_symbol(gene_symbol=gene_symbol)
-        if cpm_normalise:
-            print("Debug: CPM normalising gene expression...")
-            gene_expr = gene_expr / self.get_nUMI()
-        if log_transform:
-            print("Debug: log-transforming gene expression...")
-            gene_expr = np.log2(gene_expr + 1)
+        genes_expr, cell_indices = self.get_genes_expression(gene_symbols=[gene_symbol],
+                                                             log_transform=log_transform,
+                                                             cpm_normalise=cpm_normalise,
+                                                             annotation=annotation,
+                                                             logic=logic)
+        return genes_expr[0], cell_indices
+
+    def get_genes_expression(self, gene_symbols, log_transform=True, cpm_normalise=False, annotation='', logic='OR'):
+        """Read the expression of several genes with a single HDF5 read.
+
+        Returns:
+            tuple: A float32 (len(gene_symbols) x cells) array in the order of gene_symbols and the selected cell indices.
+
+        """
+        print("Debug: getting expression of " + ", ".join(gene_symbols) + "...")
+        rows = np.array([self.get_gene_row_index(gene_symbol=gene_symbol) for gene_symbol in gene_symbols], dtype=np.int64)
+        genes_expr = np.empty((len(rows), self.get_nb_cells()), dtype=np.float32)
+        transform = (bool(log_transform), bool(cpm_normalise))
+        uncached = []
+        for n, row in enumerate(rows):
+            row_expr = Loom.row_cache.get(key=(self.partial_md5_hash, row, transform))
+            if row_expr is None:
+                uncached.append(n)
+            else:
+                genes_expr[n] = row_expr
+        if len(uncached) > 0:
+            # HDF5 fancy indexing only accepts increasing indices
+            uncached_rows, rows_order = np.unique(rows[uncached], return_inverse=True)
+            uncached_expr = np.empty((len(uncached_rows), self.get_nb_cells()), dtype=np.float32)
+            uncached_expr[:] = self.loom_connection[uncached_rows, :]
+            if cpm_normalise:
+                print("Debug: CPM normalising gene expression...")
+            if log_transform:
+                print("Debug: log-transforming gene expression...")
+            self.transform_expression(expr=uncached_expr, log_transform=log_transform, cpm_normalise=cpm_normalise)
+            for row, row_expr in zip(uncached_rows, uncached_expr):
+                Loom.row_cache.put(key=(self.partial_md5_hash, row, transform), row=row_expr.copy())
+            genes_expr[uncached] = uncached_expr[rows_order]
         if len(annotation) > 0:
             cell_indices = self.get_anno_cells(annotations=annotation, logic=logic)
-            gene_expr = gene_expr[cell_indices]
+            genes_expr = genes_expr[:, cell_indices]
         else:
             cell_indices = list(range(self.get_nb_cells()))
-        return gene_expr, cell_indices
+        return genes_expr, cell_indices
+
+    def transform_expression(self, expr, log_transform=True, cpm_normalise=False):
+        # In place, on a float32 (genes x cells) array
+        if cpm_normalise:
+            expr /= self.get_nUMI()
+        if log_transform:
+            expr += 1
+            np.log2(expr, out=expr)
 
     ############
     # Regulons #
@@ -309,17 +805,49 @@ class Loom():
     def has_regulons_AUC(self):
         return "RegulonsAUC" in self.loom_connection.ca.keys()
 
+    def get_regulon_names(self):
+        if self.regulon_names is None:
+            self.regulon_names = [name.replace(' ', '_') for name in self.loom_connection.ca.RegulonsAUC.dtype.names]
+        return self.regulon_names
+
+    def get_regulon_index(self):
+        if self.regulon_index is None:
+            self.regulon_index = {name: n for n, name in enumerate(self.get_regulon_names())}
+        return self.regulon_index
+
     def get_regulons_AUC(self):
-        loom = self.loom_connection
-        L = loom.ca.RegulonsAUC.dtype.names
-        loom.ca.RegulonsAUC.dtype.names = list(map(lambda s: s.replace(' ', '_'), L))
-        return loom.ca.RegulonsAUC
+        """Get the AUC values of all the regulons as a float32 (regulons x cells) array.
+
+        The array is built once from the RegulonsAUC column attribute and stored in the cache folder,
+        from where it is memory-mapped so that a regulon is a contiguous row.
+
+        """
+        if self.regulons_AUC is None:
+            self.index_builds.do(key="regulons_AUC", fn=self.build_regulons_AUC)
+        return self.regulons_AUC
+
+    def build_regulons_AUC(self):
+        if self.regulons_AUC is not None:
+            return
+        shape = (len(self.get_regulon_names()), self.get_nb_cells())
+        regulons_AUC = self.load_cache_array(suffix="RegulonsAUC.npy", mmap_mode='r')
+        if regulons_AUC is None or regulons_AUC.shape != shape:
+            ca_regulons_AUC = self.loom_connection.ca.RegulonsAUC
+            regulons_AUC = np.empty(shape, dtype=np.float32)
+            for n, name in enumerate(ca_regulons_AUC.dtype.names):
+                regulons_AUC[n] = ca_regulons_AUC[name]
+            self.save_cache_array(suffix="RegulonsAUC.npy", arr=regulons_AUC)
+            mmapped_regulons_AUC = self.load_cache_array(suffix="RegulonsAUC.npy", mmap_mode='r')
+            if mmapped_regulons_AUC is not None:
+                regulons_AUC = mmapped_regulons_AUC
+        self.regulons_AUC = regulons_AUC
+        self.set_cached_bytes(key="regulons_AUC", obj=regulons_AUC)
 
     def get_auc_values(self, regulon, annotation='', logic='OR'):
         print("Debug: getting AUC values for {0} ...".format(regulon))
         cellIndices = list(range(self.get_nb_cells()))
-        if regulon in self.get_regulons_AUC().dtype.names:
-            vals = self.get_regulons_AUC()[regulon]
+        if regulon in self.get_regulon_index():
+            vals = self.get_regulons_AUC()[self.get_regulon_index()[regulon]]
             if len(annotation) > 0:
                 cellIndices = self.get_anno_cells(annotations=annotation, logic=logic)
                 vals = vals[cellIndices]
@@ -330,51 +858,65 @@ class Loom():
     # Embeddings #
     ##############
 
-    def get_coordinates(self, coordinatesID=-1, annotation='', logic='OR'):
+    @staticmethod
+    def is_constant(vals):
+        return len(vals) > 0 and np.min(vals) == np.max(vals)
+
+    def get_default_embedding_coordinates(self):
         loom = self.loom_connection
-        dims = 0
+        if self.has_ca_attr(name="Embedding"):
+            self.default_embedding_source = "Embedding"
+            return loom.ca['Embedding']['_X'], loom.ca['Embedding']['_Y']
+        if self.has_ca_attr(name="_tSNE1") and self.has_ca_attr(name="_tSNE2"):
+            x = loom.ca['_tSNE1']
+            y = loom.ca['_tSNE2']
+            if not Loom.is_constant(x) and not Loom.is_constant(y):
+                self.default_embedding_source = "_tSNE1/_tSNE2"
+                return x, y
+        if self.has_ca_attr(name="_X") and self.has_ca_attr(name="_Y"):
+            x = loom.ca['_X']
+            y = loom.ca['_Y']
+            if not Loom.is_constant(x) and not Loom.is_constant(y):
+                self.default_embedding_source = "_X/_Y"
+                return x, y
+        self.default_embedding_source = "cell index"
+        return np.arange(self.get_nb_cells()), np.arange(self.get_nb_cells())
+
+    def get_embedding(self, coordinatesID=-1):
+        """Get the coordinates of the given embedding as a float32 (2 x cells) array, with y already flipped.
+
+        The default embedding (-1) is taken from the first usable column attribute(s) among Embedding, _tSNE1/_tSNE2 and _X/_Y.
+
+        """
+        if coordinatesID not in self.embeddings:
+            self.index_builds.do(key=("embedding", coordinatesID), fn=self.build_embedding, coordinatesID=coordinatesID)
+        return self.embeddings[coordinatesID]
+
+    def build_embedding(self, coordinatesID):
+        if coordinatesID in self.embeddings:
+            return
         if coordinatesID == -1:
-            try:
-                embedding = loom.ca['Embedding']
-                x = embedding['_X']
-                y = embedding['_Y']
-            except AttributeError:
-                try:
-                    x = loom.ca['_tSNE1']
-                    y = loom.ca['_tSNE2']
-                    if len(set(x)) == 1 or len(set(y)) == 1:
-                        raise AttributeError
-                except AttributeError:
-                    try:
-                        x = loom.ca['_X']
-                        y = loom.ca['_Y']
-                        if len(set(x)) == 1 or len(set(y)) == 1:
-                            raise AttributeError
-                    except AttributeError:
-                        x = [n for n in range(len(loom.shape[1]))]
-                        y = [n for n in range(len(loom.shape[1]))]
-                # for ca in loom.ca.keys():
-                    # if 'tSNE'.casefold() in ca.casefold():
-                    #     print(ca)
-                    #     if dims == 0:
-                    #         x = loom.ca[ca]
-                    #         dims += 1
-                    #         continue
-                    #     if dims == 1:
-                    #         y = loom.ca[ca]
-                    #         dims += 1
-                    #         continue
+            x, y = self.get_default_embedding_coordinates()
+            print("Debug: default embedding of {0} taken from {1}".format(self.get_abs_file_path(), self.default_embedding_source))
         else:
-            x = loom.ca.Embeddings_X[str(coordinatesID)]
-            y = loom.ca.Embeddings_Y[str(coordinatesID)]
+            x = self.loom_connection.ca.Embeddings_X[str(coordinatesID)]
+            y = self.loom_connection.ca.Embeddings_Y[str(coordinatesID)]
+        embedding = np.empty((2, self.get_nb_cells()), dtype=np.float32)
+        embedding[0] = x
+        np.negative(y, out=embedding[1], casting='unsafe')
+        embedding.setflags(write=False)
+        self.embeddings[coordinatesID] = embedding
+        self.set_cached_bytes(key=("embedding", coordinatesID), obj=embedding)
+
+    def get_coordinates(self, coordinatesID=-1, annotation='', logic='OR'):
+        embedding = self.get_embedding(coordinatesID=coordinatesID)
         if len(annotation) > 0:
             cellIndices = self.get_anno_cells(annotations=annotation, logic=logic)
-            x = x[cellIndices]
-            y = y[cellIndices]
+            embedding = embedding[:, cellIndices]
         else:
             cellIndices = list(range(self.get_nb_cells()))
-        return {"x": x,
-                "y": -y,
+        return {"x": embedding[0],
+                "y": embedding[1],
                 "cellIndices": cellIndices}
 
     ##############
@@ -415,8 +957,28 @@ class Loom():
     # Clusterings #
     ###############
 
+    def get_clustering(self, clustering_id):
+        """Get the int32 cluster labels of the given clustering and the size of each of its clusters."""
+        clustering_id = str(clustering_id)
+        if clustering_id not in self.clusterings:
+            self.index_builds.do(key=("clustering", clustering_id), fn=self.build_clustering, clustering_id=clustering_id)
+        return self.clusterings[clustering_id]
+
+    def build_clustering(self, clustering_id):
+        if clustering_id in self.clusterings:
+            return
+        labels = np.asarray(self.loom_connection.ca.Clusterings[clustering_id]).astype(np.int32)
+        labels.setflags(write=False)
+        cluster_ids, cluster_sizes = np.unique(labels, return_counts=True)
+        self.clusterings[clustering_id] = {"labels": labels,
+                                           "sizes": dict(zip(cluster_ids.tolist(), cluster_sizes.tolist()))}
+        self.set_cached_bytes(key=("clustering", clustering_id), obj=self.clusterings[clustering_id])
+
     def get_clustering_by_id(self, clustering_id):
-        return self.loom_connection.ca.Clusterings[str(clustering_id)]
+        return self.get_clustering(clustering_id=clustering_id)["labels"]
+
+    def get_cluster_sizes(self, clustering_id):
+        return self.get_clustering(clustering_id=clustering_id)["sizes"]
 
     # def get_cluster_IDs(self, loom_file_path, clustering_id):
     #     loom = self.lfh.get_loom_connection(loom_file_path)
@@ -425,10 +987,212 @@ class Loom():
     def has_cluster_markers(self, clustering_id):
         return "ClusterMarkers_{0}".format(clustering_id) in self.loom_connection.ra.keys()
 
+    def get_cluster_markers(self, clustering_id):
+        """Index the cluster markers of the given clustering.
+
+        Returns:
+            dict: cluster id (str) -> dict with the int32 row indices of the marker genes ("genes")
+            and the non-zero values of each marker metric by accessor ("metrics").
+
+        """
+        clustering_id = str(clustering_id)
+        if clustering_id not in self.cluster_markers:
+            self.index_builds.do(key=("cluster_markers", clustering_id), fn=self.build_cluster_markers, clustering_id=clustering_id)
+        return self.cluster_markers[clustering_id]
+
+    def build_cluster_markers(self, clustering_id):
+        if clustering_id in self.cluster_markers:
+            return
+        ra = self.loom_connection.ra
+        markers = ra["ClusterMarkers_{0}".format(clustering_id)]
+        metric_prefix = "ClusterMarkers_{0}_".format(clustering_id)
+        metrics = {name[len(metric_prefix):]: ra[name] for name in ra.keys() if name.startswith(metric_prefix)}
+        cluster_markers = {}
+        for cluster_id in markers.dtype.names:
+            cluster_metrics = {}
+            for metric_accessor, metric in metrics.items():
+                cluster_marker_metric = metric[cluster_id]
+                cluster_metrics[metric_accessor] = cluster_marker_metric[cluster_marker_metric != 0]
+            cluster_markers[cluster_id] = {"genes": np.flatnonzero(markers[cluster_id] == 1).astype(np.int32),
+                                           "metrics": cluster_metrics}
+        self.cluster_markers[clustering_id] = cluster_markers
+        self.set_cached_bytes(key=("cluster_markers", clustering_id), obj=cluster_markers)
+
     def get_cluster_marker_genes(self, clustering_id, cluster_id):
-        return self.get_genes()[self.loom_connection.ra["ClusterMarkers_{0}".format(clustering_id)][str(cluster_id)] == 1]
+        return self.get_genes()[self.get_cluster_markers(clustering_id=clustering_id)[str(cluster_id)]["genes"]]
 
     def get_cluster_marker_metrics(self, clustering_id, cluster_id, metric_accessor):
-        cluster_marker_metric = self.loom_connection.row_attrs["ClusterMarkers_{0}_{1}".format(clustering_id, metric_accessor)][str(cluster_id)]
-        # Return non-zero values
-        return cluster_marker_metric[cluster_marker_metric != 0]
+        # Non-zero values only
+        return self.get_cluster_markers(clustering_id=clustering_id)[str(cluster_id)]["metrics"][metric_accessor]
+
+    #################
+    # Feature stats #
+    #################
+
+    def get_metric_names(self):
+        if not self.has_md_metrics():
+            return []
+        return [metric['name'] for metric in self.get_meta_data()['metrics'] if self.has_ca_attr(name=metric['name'])]
+
+    def get_feature_stats_index(self, feature_type, feature):
+        # Index of the given feature in the feature stats table, None if it is not in the .loom
+        n_genes = len(self.get_genes())
+        if feature_type == 'gene':
+            return self.get_gene_index().get(feature)
+        if feature_type == 'regulon':
+            if self.has_regulons_AUC() and feature in self.get_regulon_index():
+                return n_genes + self.get_regulon_index()[feature]
+            return None
+        if feature_type == 'metric':
+            metric_names = self.get_metric_names()
+            if feature in metric_names:
+                n_regulons = len(self.get_regulon_names()) if self.has_regulons_AUC() else 0
+                return n_genes + n_regulons + metric_names.index(feature)
+        return None
+
+    def get_feature_stats_shape(self):
+        n_regulons = len(self.get_regulon_names()) if self.has_regulons_AUC() else 0
+        return (len(self.get_genes()) + n_regulons + len(self.get_metric_names()), len(FeatureStats.TRANSFORMS), len(FeatureStats.STATS))
+
+    def get_feature_vmax(self, feature_type, feature, log_transform=True, cpm_normalise=False):
+        """Get the vmax and the maximum of a feature over all the cells from the feature stats table.
+
+        Returns:
+            tuple: The vmax and the maximum, None if the table is not ready yet (its computation is then started).
+
+        """
+        if self.feature_stats is None:
+            self.start_feature_stats()
+            return None
+        feature_index = self.get_feature_stats_index(feature_type=feature_type, feature=feature)
+        if feature_index is None:
+            return None
+        return self.feature_stats.get_feature_vmax(feature_index=feature_index, log_transform=log_transform, cpm_normalise=cpm_normalise)
+
+    def start_feature_stats(self):
+        """Load the feature stats table from the cache folder, or queue its computation in the background if it is not there.
+
+        The scans of all the .loom files share a pool of Constant._FEATURE_STATS_WORKERS threads.
+
+        """
+        if self.feature_stats is None and self.feature_stats_future is None:
+            self.index_builds.do(key="feature_stats", fn=self.build_feature_stats)
+
+    @staticmethod
+    def stop_feature_stats():
+        # Skip the queued scans and stop the running ones, e.g.: when the server stops
+        Loom.feature_stats_shutdown.set()
+
+    def is_feature_stats_stopped(self):
+        return self.feature_stats_stop.is_set() or Loom.feature_stats_shutdown.is_set()
+
+    def build_feature_stats(self):
+        if self.feature_stats is not None or self.feature_stats_future is not None:
+            return
+        stats = self.load_cache_array(suffix="FeatureStats.npy")
+        if stats is not None and stats.shape == self.get_feature_stats_shape():
+            self.feature_stats = FeatureStats(stats=stats)
+            self.set_cached_bytes(key="feature_stats", obj=stats)
+            return
+        self.feature_stats_future = Loom.feature_stats_executor.submit(self.run_feature_stats)
+
+    def run_feature_stats(self):
+        # The scan keeps the .loom open until it is done, it is skipped (or stops early) if the .loom is evicted meanwhile
+        if self.is_feature_stats_stopped() or not self.acquire():
+            return
+        start_time = time.time()
+        try:
+            stats = self.compute_feature_stats()
+        except Exception as e:
+            print("Warning: could not compute the feature stats of {0}: {1}".format(self.get_abs_file_path(), e))
+            return
+        finally:
+            self.release()
+        if stats is None:
+            return
+        self.save_cache_array(suffix="FeatureStats.npy", arr=stats)
+        self.feature_stats = FeatureStats(stats=stats)
+        self.set_cached_bytes(key="feature_stats", obj=stats)
+        print("Debug: %s seconds elapsed (computing the feature stats of %s) ---" % (time.time() - start_time, self.get_abs_file_path()))
+
+    def compute_feature_stats(self, batch_bytes=Constant._FEATURE_STATS_BATCH_BYTES):
+        """Compute the stats of all the features in a single pass over the matrix.
+
+        Genes are transformed by batches of rows so that about batch_bytes of expression values are in memory at once,
+        on top of the block of whole HDF5 chunks they are read from.
+
+        Returns:
+            numpy.ndarray: The stats table (see FeatureStats), None if the .loom has been closed in the meantime.
+
+        """
+        stats = np.zeros(self.get_feature_stats_shape(), dtype=np.float64)
+        n_genes = len(self.get_genes())
+        n_cells = self.get_nb_cells()
+        # Room for the raw and the transformed values of a batch
+        batch_size = max(1, batch_bytes // (2 * 4 * max(n_cells, 1)))
+        # Blocks of whole HDF5 chunks are read so that each chunk is decompressed only once (even when a chunk has more
+        # rows than a batch), their rows are then transformed and summarised by batches
+        chunk_rows = self.get_matrix_chunk_rows()
+        block_size = -(-batch_size // chunk_rows) * chunk_rows
+        for start in range(0, n_genes, block_size):
+            if self.is_feature_stats_stopped():
+                return None
+            end = min(start + block_size, n_genes)
+            raw_expr = np.empty((end - start, n_cells), dtype=np.float32)
+            raw_expr[:] = self.loom_connection[start:end, :]
+            for batch_start in range(0, end - start, batch_size):
+                batch_end = min(batch_start + batch_size, end - start)
+                for n, (log_transform, cpm_normalise) in enumerate(FeatureStats.TRANSFORMS):
+                    expr = raw_expr[batch_start:batch_end].copy()
+                    # Cells without UMI give NaNs when CPM normalised, as in get_genes_expression
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        self.transform_expression(expr=expr, log_transform=log_transform, cpm_normalise=cpm_normalise)
+                    stats[start + batch_start:start + batch_end, n] = FeatureStats.compute(vals=expr)
+        feature_index = n_genes
+        if self.has_regulons_AUC():
+            regulons_AUC = self.get_regulons_AUC()
+            for start in range(0, len(regulons_AUC), batch_size):
+                if self.is_feature_stats_stopped():
+                    return None
+                end = min(start + batch_size, len(regulons_AUC))
+                stats[feature_index + start:feature_index + end] = FeatureStats.compute(vals=np.asarray(regulons_AUC[start:end]))[:, np.newaxis]
+            feature_index += len(regulons_AUC)
+        for metric_name in self.get_metric_names():
+            for n, (log_transform, cpm_normalise) in enumerate(FeatureStats.TRANSFORMS):
+                vals, _ = self.get_metric(metric_name=metric_name, log_transform=log_transform, cpm_normalise=cpm_normalise)
+                stats[feature_index, n] = FeatureStats.compute(vals=np.asarray(vals)[np.newaxis])[0]
+            feature_index += 1
+        return stats
+
+    ##########
+    # Search #
+    ##########
+
+    def get_search_index(self, cross_species=''):
+        """Get the search index of the features of this .loom (or of the genes of the given species mapped to it)."""
+        if cross_species not in self.search_indexes:
+            self.index_builds.do(key=("search_index", cross_species), fn=self.build_search_index, cross_species=cross_species)
+        return self.search_indexes[cross_species]
+
+    def build_search_index(self, cross_species):
+        if cross_species in self.search_indexes:
+            return
+        if cross_species != '' and self.infer_species()[0] == 'dmel':
+            if cross_species not in Loom.cross_species_search_indexes:
+                Loom.cross_species_index_builds.do(key=cross_species, fn=self.build_cross_species_search_index, cross_species=cross_species)
+            self.search_indexes[cross_species] = Loom.cross_species_search_indexes[cross_species]
+            return
+        start_time = time.time()
+        search_index = ss.SearchIndex(search_space=ss.SearchSpace(loom=self, cross_species=cross_species).build())
+        print("Debug: %s seconds elapsed (indexing {0} features) ---".format(len(search_index)) % (time.time() - start_time))
+        self.search_indexes[cross_species] = search_index
+        self.set_cached_bytes(key=("search_index", cross_species), obj=vars(search_index))
+
+    def build_cross_species_search_index(self, cross_species):
+        if cross_species in Loom.cross_species_search_indexes:
+            return
+        start_time = time.time()
+        search_index = ss.SearchIndex(search_space=ss.SearchSpace(loom=self, cross_species=cross_species).build())
+        print("Debug: %s seconds elapsed (indexing {0} {1} genes) ---".format(len(search_index), cross_species) % (time.time() - start_time))
+        Loom.cross_species_search_indexes[cross_species] = search_index
+        Loom.set_shared_bytes(key=("cross_species_search_index", cross_species), obj=vars(search_index))
@@ -1,21 +1,141 @@
 import os
 import hashlib
+import threading
+import time
+from concurrent import futures
 import loompy as lp
+from collections import OrderedDict
 
 from scopeserver.utils import DataFileHandler as dfh
+from scopeserver.utils import Constant
 from scopeserver.utils.Loom import Loom
+from scopeserver.utils.SingleFlight import SingleFlight
 
 class LoomFileHandler():
 
-    def __init__(self):
-        self.active_looms = {}
+    def __init__(self, max_open_looms=Constant._OPEN_LOOMS_LIMIT, max_open_looms_bytes=Constant._OPEN_LOOMS_MAX_BYTES):
+        # Open .loom files from the least to the most recently used
+        self.active_looms = OrderedDict()
+        self.active_looms_lock = threading.RLock()
+        self.max_open_looms = max_open_looms
+        self.max_open_looms_bytes = max_open_looms_bytes
         self.loom_dir = dfh.DataFileHandler.get_data_dir_path_by_file_type(file_type="Loom")
+        # Registry of the partial md5 hash of each .loom path along with the file fingerprint it was computed for
+        self.loom_identities = {}
+        self.loom_identities_lock = threading.Lock()
+        self.loom_identity_stats = {"fast": 0, "slow": 0}
+        # Former hashes of the .loom files modified since they were hashed, their cache files are deleted by evict_deleted_looms
+        self.superseded_loom_hashes = set()
+        # Looms being warmed up in the background and looms already warm (until they are evicted)
+        self.warming_looms = set()
+        self.warm_looms = set()
+        # Set to stop warming up looms, e.g.: when the server stops (see stop_prewarm)
+        self.prewarm_stop = threading.Event()
+        self.prewarm_executor = None
+        self.prewarm_lock = threading.Lock()
+        self.loom_loads = SingleFlight()
+        # Looms leased by get_loom in each thread, released once the RPC is done (see start_leases and release_leases)
+        self.thread_leases = threading.local()
     
     def add_loom(self, partial_md5_hash, file_path, abs_file_path, loom_connection):
         loom = Loom(partial_md5_hash=partial_md5_hash, file_path=file_path, abs_file_path=abs_file_path, loom_connection=loom_connection)
-        self.active_looms[partial_md5_hash] = loom
+        # The budget is checked again whenever the caches of the loom grow
+        loom.on_cache_growth = self.evict_looms
+        with self.active_looms_lock:
+            self.active_looms[partial_md5_hash] = loom
+            # The open looms are already printed if some have been evicted
+            if not self.evict_looms():
+                print("Debug: open looms {0}".format(self.get_active_looms_stats()))
         return loom
 
+    def remove_loom(self, partial_md5_hash):
+        with self.active_looms_lock:
+            loom = self.active_looms.pop(partial_md5_hash, None)
+            if loom is not None:
+                self.warm_looms.discard(loom.get_file_path())
+        if loom is not None:
+            loom.evict()
+
+    def evict_looms(self):
+        # Evict the least recently used looms until both the number of open looms and their memory fit the limits.
+        # The most recently used loom is always kept open, evicted looms are closed once no request uses them anymore.
+        # Returns whether some looms have been evicted.
+        with self.active_looms_lock:
+            footprints = OrderedDict((k, loom.get_memory_footprint()) for k, loom in self.active_looms.items())
+            total_footprint = sum(footprints.values()) + Loom.get_shared_memory_footprint()
+            evicted = False
+            while len(self.active_looms) > 1 and (len(self.active_looms) > self.max_open_looms or total_footprint > self.max_open_looms_bytes):
+                partial_md5_hash, loom = self.active_looms.popitem(last=False)
+                total_footprint -= footprints[partial_md5_hash]
+                print("Debug: evicting {0} from the open looms...".format(loom.get_abs_file_path()))
+                self.warm_looms.discard(loom.get_file_path())
+                loom.evict()
+                evicted = True
+            if evicted:
+                print("Debug: open looms {0}".format(self.get_active_looms_stats()))
+            return evicted
+
+    def evict_deleted_looms(self):
+        # Close the looms whose file has been deleted (e.g.: expired user sessions) and delete their cache files,
+        # along with the looms and the cache files of the former hashes of the modified files
+        with self.active_looms_lock:
+            deleted = [k for k, loom in self.active_looms.items() if not os.path.exists(loom.get_abs_file_path())]
+        for partial_md5_hash in deleted:
+            self.remove_loom(partial_md5_hash=partial_md5_hash)
+        deleted_hashes = set(deleted)
+        with self.loom_identities_lock:
+            for abs_loom_file_path in [p for p in self.loom_identities.keys() if not os.path.exists(p)]:
+                deleted_hashes.add(self.loom_identities.pop(abs_loom_file_path)[1])
+            remaining_file_paths = list(self.loom_identities.keys())
+        remaining_hashes = set()
+        for abs_loom_file_path in remaining_file_paths:
+            # Up to date identities: a .loom opened in r+ mode can have been modified since it was hashed
+            try:
+                remaining_hashes.add(self.get_loom_identity(abs_loom_file_path=abs_loom_file_path))
+            except ValueError:
+                pass
+        with self.loom_identities_lock:
+            superseded_hashes = self.superseded_loom_hashes - remaining_hashes
+            self.superseded_loom_hashes = set()
+        for partial_md5_hash in superseded_hashes:
+            self.remove_loom(partial_md5_hash=partial_md5_hash)
+        deleted_hashes.update(superseded_hashes)
+        with self.active_looms_lock:
+            remaining_hashes.update(self.active_looms.keys())
+        # The same file can be at several paths (e.g.: a public loom uploaded by a user)
+        for partial_md5_hash in deleted_hashes - remaining_hashes:
+            LoomFileHandler.remove_loom_cache_files(partial_md5_hash=partial_md5_hash)
+
+    @staticmethod
+    def remove_loom_cache_files(partial_md5_hash):
+        # Delete the files cached for a .loom in the cache folder (<partial md5 hash>.*: nUMI, RegulonsAUC, FeatureStats, ...)
+        cache_dir = dfh.DataFileHandler.get_data_dir_path_by_file_type(file_type="Cache")
+        for cache_file_name in os.listdir(cache_dir):
+            if cache_file_name.startswith(partial_md5_hash + '.'):
+                print("Debug: removing the cache file {0}...".format(cache_file_name))
+                try:
+                    os.remove(os.path.join(cache_dir, cache_file_name))
+                except OSError as e:
+                    print("Warning: could not remove the cache file {0}: {1}".format(cache_file_name, e))
+
+    def get_active_looms_stats(self):
+        """List the open looms from the least to the most recently used along with their estimated memory footprint.
+
+        The structures shared by several looms are only counted in "sharedBytes".
+
+        """
+        with self.active_looms_lock:
+            looms = [{"loomFilePath": loom.get_file_path(),
+                      "partialMD5Hash": partial_md5_hash,
+                      "bytes": loom.get_memory_footprint(),
+                      "warm": self.is_loom_warm(loom_file_path=loom.get_file_path())} for partial_md5_hash, loom in self.active_looms.items()]
+        shared_bytes = Loom.get_shared_memory_footprint()
+        return {"looms": looms,
+                "sharedBytes": shared_bytes,
+                "bytes": sum(loom["bytes"] for loom in looms) + shared_bytes,
+                "maxBytes": self.max_open_looms_bytes,
+                "maxLooms": self.max_open_looms}
+
     def load_loom_file(self, partial_md5_hash, file_path, abs_file_path, rw=False):
         # if rw:
         #     loom = lp.connect(file_path, mode='r+')
@@ -38,23 +158,55 @@ class LoomFileHandler():
             else:
                 f.seek(- last_n_kb * 1024, 2)
             return hashlib.md5(f.read()).hexdigest()
+
+    @staticmethod
+    def get_file_fingerprint(file_path):
+        file_stat = os.stat(file_path)
+        return (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+    def get_loom_identity(self, abs_loom_file_path):
+        """Get the partial md5 hash identifying the given .loom file.
+
+        The hash is only recomputed when the (inode, size, mtime) fingerprint of the file changed since it was last computed.
+
+        """
+        try:
+            fingerprint = LoomFileHandler.get_file_fingerprint(file_path=abs_loom_file_path)
+        except FileNotFoundError:
+            raise ValueError('The file located at ' +
+                             abs_loom_file_path + ' does not exist.')
+        with self.loom_identities_lock:
+            loom_identity = self.loom_identities.get(abs_loom_file_path)
+            if loom_identity is not None and loom_identity[0] == fingerprint:
+                self.loom_identity_stats["fast"] += 1
+                return loom_identity[1]
+            self.loom_identity_stats["slow"] += 1
+        print("Debug: computing the md5 of {0}...".format(abs_loom_file_path))
+        partial_md5_hash = LoomFileHandler.get_partial_md5_hash(abs_loom_file_path, 10000)
+        with self.loom_identities_lock:
+            loom_identity = self.loom_identities.get(abs_loom_file_path)
+            if loom_identity is not None and loom_identity[1] != partial_md5_hash:
+                print("Debug: {0} has been modified since it was hashed".format(abs_loom_file_path))
+                self.superseded_loom_hashes.add(loom_identity[1])
+            self.loom_identities[abs_loom_file_path] = (fingerprint, partial_md5_hash)
+        return partial_md5_hash
+
+    def get_loom_identity_stats(self):
+        with self.loom_identities_lock:
+            return dict(self.loom_identity_stats)
     
     def change_loom_mode(self, loom_file_path, mode):
         print(loom_file_path)
-        if not os.path.exists(loom_file_path):
-            raise ValueError('The file located at ' +
-                             loom_file_path + ' does not exist.')
         print('{0} getting md5'.format(loom_file_path))
-        partial_md5_hash = LoomFileHandler.get_partial_md5_hash(loom_file_path, 10000)
+        partial_md5_hash = self.get_loom_identity(abs_loom_file_path=loom_file_path)
         print('{0} md5 is {1}'.format(loom_file_path, partial_md5_hash))
 
-        if partial_md5_hash in self.active_looms:
-            self.active_looms[partial_md5_hash].close()
+        self.remove_loom(partial_md5_hash=partial_md5_hash)
         if mode == 'rw':
-            self.active_looms[partial_md5_hash] = self.get_loom_connection(loom_file_path=loom_file_path) #, rw=True)
+            self.get_loom(loom_file_path=loom_file_path) #, rw=True)
             print('{0} now rw'.format(loom_file_path))
         else:
-            self.active_looms[partial_md5_hash] = self.get_loom_connection(loom_file_path=loom_file_path) #, rw=False)
+            self.get_loom(loom_file_path=loom_file_path) #, rw=False)
             print('{0} now ro'.format(loom_file_path))
         
     def get_loom_absolute_file_path(self, loom_file_path):
@@ -69,14 +221,119 @@ class LoomFileHandler():
     def get_loom_connection(self, loom_file_path):
         return self.get_loom(loom_file_path=loom_file_path).get_connection()
 
+    def prewarm_looms(self, loom_file_paths, warm_loom, max_workers=Constant._PREWARM_WORKERS):
+        """Open and warm up the given looms with warm_loom(loom) in a background pool of max_workers threads.
+
+        warm_loom returns False if it did not warm up the loom.
+
+        Only as many looms as can be kept open are warmed up, the others would evict the looms warmed up before them.
+
+        """
+        if len(loom_file_paths) > self.max_open_looms:
+            print("Debug: prewarming only the first {0} of {1} looms".format(self.max_open_looms, len(loom_file_paths)))
+            loom_file_paths = loom_file_paths[:self.max_open_looms]
+        prewarm_thread = threading.Thread(target=self.run_prewarm, args=(loom_file_paths, warm_loom, max_workers), daemon=True)
+        prewarm_thread.start()
+        return prewarm_thread
+
+    def run_prewarm(self, loom_file_paths, warm_loom, max_workers):
+        start_time = time.time()
+        timings = {}
+        with self.prewarm_lock:
+            if self.prewarm_stop.is_set():
+                return timings
+            executor = self.prewarm_executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+            prewarms = {executor.submit(self.prewarm_loom, loom_file_path, warm_loom): loom_file_path for loom_file_path in loom_file_paths}
+        # Not futures.as_completed: the futures cancelled by stop_prewarm would never be reported as completed
+        for prewarm, loom_file_path in prewarms.items():
+            try:
+                timings[loom_file_path] = prewarm.result()
+            except futures.CancelledError:
+                # Still queued when the prewarm was stopped
+                pass
+        executor.shutdown()
+        print("Debug: %s seconds elapsed (prewarming {0} looms) ---".format(len(loom_file_paths)) % (time.time() - start_time))
+        for loom_file_path, elapsed_time in sorted(timings.items(), key=lambda x: -x[1]):
+            print("Debug: {0:.2f} seconds elapsed prewarming {1}".format(elapsed_time, loom_file_path))
+        print("Debug: open looms {0}".format(self.get_active_looms_stats()))
+        return timings
+
+    def prewarm_loom(self, loom_file_path, warm_loom):
+        # Requests do not wait for the warm up: concurrent opens of the loom and builds of its indexes are shared anyway
+        start_time = time.time()
+        if self.prewarm_stop.is_set():
+            return time.time() - start_time
+        with self.active_looms_lock:
+            self.warming_looms.add(loom_file_path)
+        previous_leases = self.start_leases()
+        try:
+            loom = self.get_loom(loom_file_path=loom_file_path)
+            if loom is not None and warm_loom(loom) is not False:
+                with self.active_looms_lock:
+                    # Not warm anymore if it has been evicted in the meantime
+                    if self.active_looms.get(loom.partial_md5_hash) is loom:
+                        self.warm_looms.add(loom_file_path)
+        except Exception as e:
+            print("Warning: could not prewarm {0}: {1}".format(loom_file_path, e))
+        finally:
+            self.release_leases(previous_leases=previous_leases)
+            with self.active_looms_lock:
+                self.warming_looms.discard(loom_file_path)
+        return time.time() - start_time
+
+    def stop_prewarm(self):
+        # Drop the looms still queued for the warm up, those being warmed up are finished
+        with self.prewarm_lock:
+            self.prewarm_stop.set()
+            if self.prewarm_executor is not None:
+                self.prewarm_executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_loom_warm(self, loom_file_path):
+        with self.active_looms_lock:
+            return loom_file_path in self.warm_looms
+
     def get_loom(self, loom_file_path):
         abs_loom_file_path = self.get_loom_absolute_file_path(loom_file_path=loom_file_path)
-        if not os.path.exists(abs_loom_file_path):
-            raise ValueError('The file located at ' +
-                             abs_loom_file_path + ' does not exist.')
         # To check if the given file path is given specified url!
-        partial_md5_hash = LoomFileHandler.get_partial_md5_hash(abs_loom_file_path, 10000)
-        if partial_md5_hash in self.active_looms:
-            return self.active_looms[partial_md5_hash]
-        print("Debug: loading the loom file from " + abs_loom_file_path + "...")
-        return self.load_loom_file(partial_md5_hash=partial_md5_hash, file_path=loom_file_path, abs_file_path=abs_loom_file_path)
+        partial_md5_hash = self.get_loom_identity(abs_loom_file_path=abs_loom_file_path)
+        while True:
+            with self.active_looms_lock:
+                loom = self.active_looms.get(partial_md5_hash)
+                if loom is not None:
+                    self.active_looms.move_to_end(partial_md5_hash)
+                    # Looms are evicted under the same lock, an active loom is never closed
+                    self.lease_loom(loom=loom)
+                    return loom
+            # Concurrent requests for the same .loom share a single load
+            if self.loom_loads.do(key=partial_md5_hash, fn=self.open_loom, partial_md5_hash=partial_md5_hash, file_path=loom_file_path, abs_file_path=abs_loom_file_path) is None:
+                return None
+
+    def lease_loom(self, loom):
+        # Leases are only taken by the threads collecting them, the other ones use the loom at their own risk
+        leases = getattr(self.thread_leases, 'looms', None)
+        if leases is not None and loom.acquire():
+            leases.append(loom)
+
+    def start_leases(self):
+        """Collect the leases taken by get_loom in the current thread until release_leases is called.
+
+        Returns:
+            list: The leases collected before, to be given back to release_leases.
+
+        """
+        previous_leases = getattr(self.thread_leases, 'looms', None)
+        self.thread_leases.looms = []
+        return previous_leases
+
+    def release_leases(self, previous_leases=None):
+        leases = getattr(self.thread_leases, 'looms', None) or []
+        self.thread_leases.looms = previous_leases
+        for loom in leases:
+            loom.release()
+
+    def open_loom(self, partial_md5_hash, file_path, abs_file_path):
+        with self.active_looms_lock:
+            if partial_md5_hash in self.active_looms:
+                return self.active_looms[partial_md5_hash]
+        print("Debug: loading the loom file from " + abs_file_path + "...")
+        return self.load_loom_file(partial_md5_hash=partial_md5_hash, file_path=file_path, abs_file_path=abs_file_path)
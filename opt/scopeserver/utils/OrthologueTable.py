@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class OrthologueTable():
+
+    '''
+    OrthologueTable class holds a <species>_to_dmel mapping (symbol -> [(dmel symbol, % identity), ...]) as sorted arrays:
+    - sources: the source symbols (utf-8), sorted by their casefolded form
+    - sources_CF: the casefolded source symbols (sorted)
+    - offsets: the orthologues of sources[i] are at offsets[i]:offsets[i + 1] in targets and identities
+    - targets: the dmel symbols (utf-8)
+    - identities: the % identity of each orthologue (float32)
+    The arrays are usually memory-mapped from the gene mapping store (see GeneMappingStore).
+    '''
+
+    ARRAY_NAMES = ['sources', 'sources_CF', 'offsets', 'targets', 'identities']
+
+    def __init__(self, sources, sources_CF, offsets, targets, identities):
+        self.sources = sources
+        self.sources_CF = sources_CF
+        self.offsets = offsets
+        self.targets = targets
+        self.identities = identities
+
+    @staticmethod
+    def compile(mappings):
+        """Compile a dict of symbol -> [(dmel symbol, % identity), ...] into the arrays of an OrthologueTable."""
+        sources = sorted(mappings.keys(), key=lambda source: (source.casefold(), source))
+        offsets = np.zeros(len(sources) + 1, dtype=np.int64)
+        np.cumsum([len(mappings[source]) for source in sources], out=offsets[1:])
+        return {"sources": np.char.encode(np.array(sources, dtype=str), 'utf-8'),
+                "sources_CF": np.char.encode(np.array([source.casefold() for source in sources], dtype=str), 'utf-8'),
+                "offsets": offsets,
+                "targets": np.char.encode(np.array([target for source in sources for target, _ in mappings[source]], dtype=str), 'utf-8'),
+                "identities": np.array([identity for source in sources for _, identity in mappings[source]], dtype=np.float32)}
+
+    def __len__(self):
+        return len(self.sources)
+
+    def get_sources(self):
+        return np.char.decode(self.sources, 'utf-8').tolist()
+
+    def get_source_index(self, source):
+        # Index of the given source symbol in sources, -1 if absent
+        source_CF = source.casefold().encode('utf-8')
+        start = np.searchsorted(self.sources_CF, source_CF, side='left')
+        end = np.searchsorted(self.sources_CF, source_CF, side='right')
+        matches = np.flatnonzero(self.sources[start:end] == source.encode('utf-8'))
+        return start + matches[0] if len(matches) > 0 else -1
+
+    def get_orthologues(self, source):
+        """Get the dmel orthologues of the given source symbol as a list of (dmel symbol, % identity)."""
+        source_index = self.get_source_index(source=source)
+        if source_index < 0:
+            raise KeyError(source)
+        start, end = self.offsets[source_index], self.offsets[source_index + 1]
+        return list(zip(np.char.decode(self.targets[start:end], 'utf-8').tolist(), self.identities[start:end].tolist()))
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+class RowCache():
+
+    '''
+    RowCache class is a thread-safe LRU cache of numpy arrays bounded by the total number of bytes it holds.
+    A single instance is shared by all the .loom files so that one memory budget applies across looms.
+    '''
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.rows = OrderedDict()
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            row = self.rows.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self.rows.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def put(self, key, row):
+        if row.nbytes > self.max_bytes:
+            return
+        # Cached rows are shared between requests: make sure nobody modifies them in place
+        row.setflags(write=False)
+        with self.lock:
+            if key in self.rows:
+                self.n_bytes -= self.rows.pop(key).nbytes
+            self.rows[key] = row
+            self.n_bytes += row.nbytes
+            self.evict()
+
+    def evict(self):
+        while self.n_bytes > self.max_bytes:
+            _, row = self.rows.popitem(last=False)
+            self.n_bytes -= row.nbytes
+            self.evictions += 1
+
+    def invalidate(self, partial_md5_hash):
+        # Drop all the rows of the given .loom file
+        with self.lock:
+            for key in [key for key in self.rows.keys() if key[0] == partial_md5_hash]:
+                self.n_bytes -= self.rows.pop(key).nbytes
+
+    def set_max_bytes(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+    def get_stats(self):
+        with self.lock:
+            return {"rows": len(self.rows),
+                    "bytes": self.n_bytes,
+                    "maxBytes": self.max_bytes,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions}
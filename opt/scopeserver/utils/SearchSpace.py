@@ -1,7 +1,11 @@
 import functools
+import bisect
+import numpy as np
 from functools import lru_cache
 
 from scopeserver.utils import DataFileHandler as dfh
+from scopeserver.utils import Constant
+from scopeserver.utils.TTLCache import TTLCache
 
 class SearchSpace(dict):
 
@@ -55,20 +59,23 @@ class SearchSpace(dict):
             # Add metrics to the search space if present in .loom
             if self.loom.has_md_metrics():
                 self.add_metrics()
+        # The search space can outlive the .loom (e.g.: the cross-species indexes are shared by all the dmel .loom files)
+        self.loom = None
+        self.meta_data = None
         return self
 
     def add_cross_species_genes(self):
-        if self.cross_species == 'hsap' and self.species == 'dmel':
-            self.add_elements(elements=dfh.DataFileHandler.hsap_to_dmel_mappings.keys(), element_type='gene')
-        elif self.cross_species == 'mmus' and self.species == 'dmel':
-            self.add_elements(elements=dfh.DataFileHandler.mmus_to_dmel_mappings.keys(), element_type='gene')
+        if self.cross_species in ['hsap', 'mmus'] and self.species == 'dmel':
+            orthologue_table = dfh.DataFileHandler.get_orthologue_table(species=self.cross_species)
+            self.add_elements(elements=orthologue_table.get_sources(), element_type='gene')
 
     def add_genes(self):
         # Add genes to search space
         if len(self.gene_mappings) > 0:
-            genes = set(self.loom.get_genes())
-            shrink_mappings = set([x for x in dfh.DataFileHandler.dmel_mappings.keys() if x in genes or dfh.DataFileHandler.dmel_mappings[x] in genes])
-            self.add_elements(elements=shrink_mappings, element_type='gene')
+            # Only the synonyms which are or map to a gene of the .loom
+            synonyms, genes = self.gene_mappings.get_mappings_of(symbols=self.loom.get_genes())
+            for synonym, gene in zip(synonyms, genes):
+                self[(synonym.casefold(), synonym, 'gene')] = gene
         else:
             self.add_elements(elements=self.loom.get_genes(), element_type='gene')
     
@@ -80,7 +87,7 @@ class SearchSpace(dict):
             self.add_elements(elements=all_clusters, element_type='Clustering: {0}'.format(clustering['name']))
     
     def add_regulons(self):
-        self.add_elements(elements=self.loom.get_regulons_AUC().dtype.names, element_type='regulon')
+        self.add_elements(elements=self.loom.get_regulon_names(), element_type='regulon')
 
     def add_annotations(self):
         annotations = []
@@ -94,4 +101,146 @@ class SearchSpace(dict):
             metrics.append(metric['name'])
         self.add_elements(elements=metrics, element_type='metric')
 
-    
\ No newline at end of file
+
+class SearchIndex():
+
+    '''
+    SearchIndex class indexes the elements of a built SearchSpace once so that typeahead queries do not scan it:
+    - The casefolded elements are sorted for prefix search
+    - The n-grams (1 to NGRAM_SIZE characters) of the casefolded elements are inverted for substring search
+    - The matches of the last query of each session are kept for a short time, so that a query extending it
+      (as when typing) only has to filter them
+    - Misspelled queries are matched through the 2- and 3-grams they share with the elements, the best candidates
+      being rescored by edit distance
+    '''
+
+    NGRAM_SIZE = 3
+
+    def __init__(self, search_space):
+        self.search_space = search_space
+        # Elements are kept in the insertion order of the search space, which breaks ties in the ranking
+        self.elements = list(search_space.keys())
+        self.keys = [element[0] for element in self.elements]
+        self.sorter = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.sorted_keys = [self.keys[position] for position in self.sorter]
+        self.key_lengths = np.array([len(key) for key in self.keys], dtype=np.int32)
+        ngrams = {}
+        for position, key in enumerate(self.keys):
+            for ngram in SearchIndex.get_ngrams(text=key):
+                ngrams.setdefault(ngram, []).append(position)
+        self.ngrams = {ngram: np.array(positions, dtype=np.int32) for ngram, positions in ngrams.items()}
+        self.cursors = TTLCache(max_size=Constant._SEARCH_CURSORS_LIMIT, ttl=Constant._SEARCH_CURSOR_TTL)
+
+    @staticmethod
+    def get_ngrams(text, sizes=range(1, NGRAM_SIZE + 1)):
+        return set(text[i:i + n] for n in sizes for i in range(len(text) - n + 1))
+
+    def __len__(self):
+        return len(self.elements)
+
+    def get_prefix_positions(self, queryCF):
+        start = bisect.bisect_left(self.sorted_keys, queryCF)
+        end = bisect.bisect_left(self.sorted_keys, queryCF + chr(0x10FFFF), lo=start)
+        return self.sorter[start:end]
+
+    def get_substring_positions(self, queryCF):
+        # Sorted positions of the elements containing queryCF
+        if len(queryCF) == 0:
+            return np.arange(len(self.elements), dtype=np.int32)
+        if len(queryCF) <= SearchIndex.NGRAM_SIZE:
+            return self.ngrams.get(queryCF, np.empty(0, dtype=np.int32))
+        postings = []
+        for ngram in SearchIndex.get_ngrams(text=queryCF, sizes=[SearchIndex.NGRAM_SIZE]):
+            if ngram not in self.ngrams:
+                return np.empty(0, dtype=np.int32)
+            postings.append(self.ngrams[ngram])
+        # Intersect the rarest n-grams, then check the candidates left
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:3]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        return np.array([position for position in candidates.tolist() if queryCF in self.keys[position]], dtype=np.int32)
+
+    def get_matching_positions(self, queryCF, session=None):
+        cursor = self.cursors.get(session) if session is not None else None
+        if cursor is not None and len(queryCF) > SearchIndex.NGRAM_SIZE and queryCF.startswith(cursor[0]):
+            # Narrow down the matches of the previous query of the session
+            positions = np.array([position for position in cursor[1].tolist() if queryCF in self.keys[position]], dtype=np.int32)
+        else:
+            positions = self.get_substring_positions(queryCF=queryCF)
+        if session is not None:
+            self.cursors.put(session, (queryCF, positions))
+        return positions
+
+    def search(self, query, session=None):
+        """Get the elements matching the given query (case insensitive), best matches first.
+
+        Elements are ranked by exact match of the element, exact match of the casefolded element, prefix match
+        and case sensitive substring match, in this order.
+
+        Args:
+            query (str): The query.
+            session (str): Identifies the successive queries of a user, used to narrow down the previous matches.
+
+        """
+        queryCF = query.casefold()
+        if len(queryCF) == 0:
+            # Every element matches, none better than the others
+            return list(self.elements)
+        positions = self.get_matching_positions(queryCF=queryCF, session=session).tolist()
+        prefix_positions = set(self.get_prefix_positions(queryCF=queryCF))
+        elements = self.elements
+
+        def rank(position):
+            element = elements[position]
+            return (element[1] != query, element[0] != queryCF, position not in prefix_positions, query not in element[0], position)
+        return [elements[position] for position in sorted(positions, key=rank)]
+
+    @staticmethod
+    def get_edit_distance(a, b, max_distance):
+        """Damerau-Levenshtein (optimal string alignment) distance between a and b, max_distance + 1 if larger."""
+        if abs(len(a) - len(b)) > max_distance:
+            return max_distance + 1
+        previous_previous = None
+        previous = list(range(len(b) + 1))
+        for i in range(1, len(a) + 1):
+            current = [i] + [0] * len(b)
+            for j in range(1, len(b) + 1):
+                cost = 0 if a[i - 1] == b[j - 1] else 1
+                current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    current[j] = min(current[j], previous_previous[j - 2] + 1)
+            if min(current) > max_distance:
+                return max_distance + 1
+            previous_previous, previous = previous, current
+        return min(previous[-1], max_distance + 1)
+
+    def fuzzy_search(self, query, n_candidates=Constant._FUZZY_SEARCH_CANDIDATES, max_distance=Constant._FUZZY_SEARCH_MAX_DISTANCE):
+        """Get the elements close to the given query (case insensitive), closest first.
+
+        The elements sharing the most 2- and 3-grams with the query are rescored by their edit distance to the query,
+        or to their prefix of the same length as the query when it is smaller. Elements further than
+        max(1, len(query) // 3) edits (bounded by max_distance) are dropped.
+
+        """
+        queryCF = query.casefold()
+        if len(queryCF) < 2:
+            return []
+        postings = [self.ngrams[ngram] for ngram in SearchIndex.get_ngrams(text=queryCF, sizes=[2, 3]) if ngram in self.ngrams]
+        if len(postings) == 0:
+            return []
+        shared_ngrams = np.bincount(np.concatenate(postings), minlength=len(self.elements))
+        candidates = np.flatnonzero(shared_ngrams)
+        if len(candidates) > n_candidates:
+            # Favour the elements whose n-grams are mostly shared with the query
+            similarity = shared_ngrams[candidates] / (2 * self.key_lengths[candidates] + len(postings))
+            candidates = candidates[np.argpartition(-similarity, n_candidates)[:n_candidates]]
+        max_distance = min(max_distance, max(1, len(queryCF) // 3))
+        ranks = []
+        for position in candidates.tolist():
+            key = self.keys[position]
+            distance = SearchIndex.get_edit_distance(a=queryCF, b=key, max_distance=max_distance)
+            prefix_distance = SearchIndex.get_edit_distance(a=queryCF, b=key[:len(queryCF)], max_distance=max_distance)
+            if min(distance, prefix_distance) <= max_distance:
+                ranks.append((min(distance, prefix_distance), distance, position))
+        return [self.elements[rank[2]] for rank in sorted(ranks)]
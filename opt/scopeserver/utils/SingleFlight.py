@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight():
+    """Coalesce concurrent calls: at most one computation runs per key, the other callers wait for its result.
+
+    Results are not kept once the computation is done: caching them is left to the caller.
+
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.shared_calls = 0
+
+    def do(self, key, fn, **kwargs):
+        with self.lock:
+            flight = self.flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self.flights[key] = Future()
+                flight.set_running_or_notify_cancel()
+                self.calls += 1
+            else:
+                self.shared_calls += 1
+        if not is_leader:
+            return flight.result()
+        try:
+            result = fn(**kwargs)
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del(self.flights[key])
+
+    def get_stats(self):
+        with self.lock:
+            return {"inFlight": len(self.flights),
+                    "calls": self.calls,
+                    "sharedCalls": self.shared_calls}
@@ -0,0 +1,56 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTLCache():
+    """Bounded cache whose entries expire ttl seconds after they were stored.
+
+    When full, expired entries are dropped first and then the least recently used ones.
+
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del(self.entries[key])
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_size:
+                self.expire()
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def expire(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self.entries.items() if entry[0] < now]:
+            del(self.entries[key])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_stats(self):
+        with self.lock:
+            return {"entries": len(self.entries),
+                    "maxSize": self.max_size,
+                    "hits": self.hits,
+                    "misses": self.misses}
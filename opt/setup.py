@@ -21,4 +21,7 @@ setup(name='scope-server',
           'pyscenic',
           'appdirs'
       ],
+      extras_require={
+          'fast-codecs': ['lz4', 'zstandard']
+      },
       zip_safe=False)
@@ -266,6 +266,7 @@ class App extends Component {
 					this.timeout = response ? parseInt(response.timeRemaining * 1000) : 0;
 					cookies.set(cookieName, uuid, { path: '/', maxAge: this.timeout });
 					if (!ping) {
+						BackendAPI.setUUID(uuid);
 						this.setState({loading: false, uuid: uuid});
 					}
 					if (!this.timer) {
@@ -115,7 +115,8 @@ export default class FeatureSearch extends React.Component {
 		if (this.state.value.length < 1) return this.resetComponent();
 		let query = {
 			loomFilePath: BackendAPI.getActiveLoom(),
-			query: this.state.value
+			query: this.state.value,
+			UUID: BackendAPI.getUUID()
 		};
 		if (DEBUG) console.log("getFeatures", query);
 		BackendAPI.getConnection().then((gbc) => {